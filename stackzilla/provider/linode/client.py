@@ -0,0 +1,219 @@
+"""Linode API client management for the Stackzilla provider."""
+import time
+import zlib
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
+
+from linode_api4 import LinodeClient
+from stackzilla.resource.exceptions import ResourceVerifyError
+
+# Number of API requests allowed per token within the rate limit window
+LINODE_REQUESTS_PER_WINDOW = 800
+
+# Length (in seconds) of the API rate limit window
+LINODE_RATE_LIMIT_WINDOW = 60
+
+
+class RateLimiter:
+    """Sliding window rate accounting for a single API token."""
+
+    def __init__(self, limit: int, window: float):
+        """Setup the request history.
+
+        Args:
+            limit (int): Number of requests allowed within the window
+            window (float): Length of the window, in seconds
+        """
+        self._limit = limit
+        self._window = window
+        self._history: Deque[float] = deque()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        """Block until a request can be issued without exceeding the rate limit."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+
+                # Forget about any requests that have aged out of the window
+                while self._history and now - self._history[0] >= self._window:
+                    self._history.popleft()
+
+                if len(self._history) < self._limit:
+                    self._history.append(now)
+                    return
+
+                delay = self._window - (now - self._history[0])
+
+            time.sleep(delay)
+
+    @property
+    def in_window(self) -> int:
+        """The number of requests issued within the current window."""
+        with self._lock:
+            return len(self._history)
+
+
+class RateLimitedLinodeClient(LinodeClient):
+    """LinodeClient which accounts every API call against the rate limit of its token."""
+
+    def __init__(self, token: str, limiter: RateLimiter):
+        """Setup the client.
+
+        Args:
+            token (str): The Linode API token
+            limiter (RateLimiter): Rate accounting for the token
+        """
+        super().__init__(token)
+        self.limiter = limiter
+
+    def _api_call(self, endpoint, model=None, method=None, data=None, filters=None):
+        """Wait for room within the rate limit before issuing the API call."""
+        self.limiter.acquire()
+        return super()._api_call(endpoint, model=model, method=method, data=data, filters=filters)
+
+
+# Rate accounting is kept per token, and shared by every pool the token is a member of
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = Lock()
+
+
+def get_rate_limiter(token: str) -> RateLimiter:
+    """Fetch (or create) the shared rate accounting for a token.
+
+    Args:
+        token (str): The Linode API token
+
+    Returns:
+        RateLimiter: The rate accounting for the token
+    """
+    with _limiters_lock:
+        if token not in _limiters:
+            _limiters[token] = RateLimiter(limit=LINODE_REQUESTS_PER_WINDOW, window=LINODE_RATE_LIMIT_WINDOW)
+
+        return _limiters[token]
+
+
+class TokenPool:
+    """A pool of API tokens (for the same account) which spreads API calls across the tokens."""
+
+    def __init__(self, tokens: List[str]):
+        """Create a client for each of the tokens.
+
+        Args:
+            tokens (List[str]): The API tokens to spread the calls across
+        """
+        self._clients = [RateLimitedLinodeClient(token, get_rate_limiter(token=token)) for token in tokens]
+
+    def client_for(self, key: str) -> RateLimitedLinodeClient:
+        """Fetch the client that owns the given key.
+
+        The same key always maps onto the same token, keeping all of the operations
+        for an entity on a single token.
+
+        Args:
+            key (str): Stable identifier for the entity (generally the resource path)
+
+        Returns:
+            RateLimitedLinodeClient: The client for the token which owns the key
+        """
+        # NOTE: crc32 is used instead of hash() so the mapping is stable between runs
+        index = zlib.crc32(key.encode('utf-8')) % len(self._clients)
+        return self._clients[index]
+
+    @property
+    def clients(self) -> List[RateLimitedLinodeClient]:
+        """All of the clients within the pool."""
+        return self._clients
+
+
+# Pools are shared across all resources so that rate accounting spans the entire blueprint
+_pools: Dict[Tuple[str, ...], TokenPool] = {}
+_pools_lock = Lock()
+
+
+def get_token_pool(tokens: List[str]) -> TokenPool:
+    """Fetch (or create) the shared pool for a set of tokens.
+
+    Args:
+        tokens (List[str]): The API tokens within the pool
+
+    Returns:
+        TokenPool: The shared pool for the tokens
+    """
+    key = tuple(tokens)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = TokenPool(tokens=list(key))
+
+        return _pools[key]
+
+
+def resolve_tokens(token: Optional[str], tokens: Optional[List[str]]) -> List[str]:
+    """Combine the single token and token pool declarations for a resource.
+
+    Args:
+        token (Optional[str]): The single token declared on the resource class
+        tokens (Optional[List[str]]): The pool of tokens declared on the resource class
+
+    Raises:
+        TypeError: Raised if tokens is a single string rather than a list of tokens
+
+    Returns:
+        List[str]: All of the declared tokens, with duplicates removed. Empty if none were declared.
+    """
+    if isinstance(tokens, str):
+        raise TypeError('tokens must be a list of tokens, not a string')
+
+    result = []
+    for value in [token] + list(tokens or []):
+        if value and value not in result:
+            result.append(value)
+
+    return result
+
+
+def verify_tokens(resource_name: str, token: Optional[str], tokens: Optional[List[str]]) -> None:
+    """Make sure a resource declared at least one usable Linode API token.
+
+    Args:
+        resource_name (str): Path of the resource being verified
+        token (Optional[str]): The single token declared on the resource class
+        tokens (Optional[List[str]]): The pool of tokens declared on the resource class
+
+    Raises:
+        ResourceVerifyError: Raised if the tokens are not a list, or if no tokens were declared
+    """
+    # A lone string would otherwise be treated as a list of single character tokens
+    if isinstance(tokens, str):
+        err = ResourceVerifyError(resource_name=resource_name)
+        err.add_attribute_error(name='tokens', error='must be a list of tokens, not a string')
+        raise err
+
+    # Make sure the user declared a token to use when authenticating with Linode
+    if not resolve_tokens(token=token, tokens=tokens):
+        err = ResourceVerifyError(resource_name=resource_name)
+        err.add_attribute_error(name='token', error='not declared')
+        raise err
+
+
+def get_client(token: Optional[str], tokens: Optional[List[str]], key: str) -> RateLimitedLinodeClient:
+    """Fetch the shared client which owns the given key.
+
+    Args:
+        token (Optional[str]): The single token declared on the resource class
+        tokens (Optional[List[str]]): The pool of tokens declared on the resource class
+        key (str): Stable identifier for the entity (generally the resource path)
+
+    Raises:
+        RuntimeError: Raised if no tokens were declared
+
+    Returns:
+        RateLimitedLinodeClient: The client for the token which owns the key
+    """
+    all_tokens = resolve_tokens(token=token, tokens=tokens)
+    if not all_tokens:
+        raise RuntimeError('No Linode API token declared')
+
+    return get_token_pool(tokens=all_tokens).client_for(key=key)
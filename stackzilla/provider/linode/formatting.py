@@ -0,0 +1,185 @@
+"""Formatting of Linode volumes on the instances they are attached to."""
+import os
+import shlex
+import time
+from typing import Dict, List
+
+from stackzilla.logger.provider import ProviderLogger
+from stackzilla.utils.ssh import CmdResult, SSHClient
+
+
+# File systems which volumes can be formatted with
+FILE_SYSTEM_TYPES = ['ext4', 'xfs', 'btrfs']
+
+# Package providing the mkfs tool for each file system, for when it is not installed on the host
+FILE_SYSTEM_PACKAGES = {'ext4': 'e2fsprogs', 'xfs': 'xfsprogs', 'btrfs': 'btrfs-progs'}
+
+# Number of seconds to wait for a volume format to complete
+FORMAT_TIMEOUT = 3600
+
+# Number of seconds between format progress checks
+FORMAT_POLL_INTERVAL = 5
+
+
+class FormatError(Exception):
+    """Raised when a volume format could not be started, failed, or did not complete in time."""
+
+
+def format_command(file_system_type: str, device: str, fast: bool) -> str:
+    """Build the mkfs command for a device.
+
+    Args:
+        file_system_type (str): One of FILE_SYSTEM_TYPES
+        device (str): Path to the device to format
+        fast (bool): Skip discarding the device and defer inode table and journal initialization until after mount
+
+    Returns:
+        str: The format command
+    """
+    if file_system_type == 'ext4':
+        options = ['-F']
+        if fast:
+            options.append('-E lazy_itable_init=1,lazy_journal_init=1,nodiscard')
+    else:
+        # xfs and btrfs both initialize lazily; discarding the device is the only slow step
+        options = ['-f']
+        if fast:
+            options.append('-K')
+
+    return f'mkfs.{file_system_type} {" ".join(options)} {device}'
+
+
+# pylint: disable=too-many-instance-attributes
+class FormatJob:
+    """A format running in the background on the host the volume is attached to."""
+
+    def __init__(self, ssh_client: SSHClient, device: str, file_system_type: str, fast: bool):
+        """Setup the job.
+
+        Args:
+            ssh_client (SSHClient): Connection to the host the volume is attached to
+            device (str): Path to the device to format
+            file_system_type (str): One of FILE_SYSTEM_TYPES
+            fast (bool): Use the fast format options (see format_command())
+        """
+        self._ssh_client = ssh_client
+        self.device = device
+        self.file_system_type = file_system_type
+        self.command = format_command(file_system_type=file_system_type, device=device, fast=fast)
+
+        name = os.path.basename(device)
+        self._log_file = f'/tmp/stackzilla-format-{name}.log'
+        self._status_file = f'/tmp/stackzilla-format-{name}.status'
+
+        self.started: float = 0
+        self.exit_code = None
+
+    @property
+    def elapsed(self) -> float:
+        """Number of seconds since the format was started."""
+        return time.monotonic() - self.started
+
+    def start(self) -> None:
+        """Launch the format on the host. Returns without waiting for it to complete.
+
+        Raises:
+            FormatError: Raised if the mkfs tool is not installed, or the format could not be launched
+        """
+        tool = f'mkfs.{self.file_system_type}'
+        result: CmdResult = self._ssh_client.run_command(command=f'command -v {tool}', sudo=True)
+        if result.exit_code:
+            raise FormatError(f'Unable to format {self.device}: {tool} is not installed '
+                              f'(provided by the {FILE_SYSTEM_PACKAGES[self.file_system_type]} package)')
+
+        script = f'{self.command} > {self._log_file} 2>&1; echo $? > {self._status_file}'
+        for command in [f'rm -f {self._status_file}', f'nohup sh -c {shlex.quote(script)} > /dev/null 2>&1 &']:
+            result: CmdResult = self._ssh_client.run_command(command=command, sudo=True)
+            if result.exit_code:
+                raise FormatError(f'Unable to start the format of {self.device}: {result.stderr or result.stdout}')
+
+        self.started = time.monotonic()
+
+    def poll(self) -> bool:
+        """Check if the format has completed.
+
+        Returns:
+            bool: True if the format has completed (successfully or not)
+        """
+        result: CmdResult = self._ssh_client.run_command(command=f'cat {self._status_file}', sudo=True)
+        if result.exit_code == 0 and result.stdout.strip():
+            self.exit_code = int(result.stdout.strip())
+            return True
+
+        return False
+
+    @property
+    def output(self) -> str:
+        """The output of the format command so far."""
+        result: CmdResult = self._ssh_client.run_command(command=f'cat {self._log_file}', sudo=True)
+        return result.stdout.strip()
+
+    def run(self, logger: ProviderLogger, timeout: int=FORMAT_TIMEOUT) -> None:
+        """Start the format and wait for it to complete, reporting progress and timing along the way.
+
+        Args:
+            logger (ProviderLogger): Logger for progress reporting
+            timeout (int, optional): Number of seconds to wait for the format. Defaults to FORMAT_TIMEOUT.
+
+        Raises:
+            FormatError: Raised if the format could not be started, failed, or did not complete in time
+        """
+        failures = run_format_jobs(jobs=[self], logger=logger, timeout=timeout)
+        if failures:
+            raise failures[self.device]
+
+
+def run_format_jobs(jobs: List[FormatJob], logger: ProviderLogger, timeout: int=FORMAT_TIMEOUT) -> Dict[str, FormatError]:
+    """Start every format, then wait on all of them together, reporting progress and timing for each device.
+
+    Args:
+        jobs (List[FormatJob]): The formats to run. Each must be for a different device.
+        logger (ProviderLogger): Logger for progress reporting
+        timeout (int, optional): Number of seconds to wait for the formats. Defaults to FORMAT_TIMEOUT.
+
+    Returns:
+        Dict[str, FormatError]: The error for each device whose format could not be started, failed, or did not
+            complete in time
+    """
+    failures: Dict[str, FormatError] = {}
+    running: List[FormatJob] = []
+
+    for job in jobs:
+        logger.log(f'Formatting: {job.command}')
+        try:
+            job.start()
+        except FormatError as err:
+            failures[job.device] = err
+            continue
+
+        running.append(job)
+
+    deadline = time.monotonic() + timeout
+    while running:
+        for job in list(running):
+            if job.poll():
+                running.remove(job)
+                if job.exit_code:
+                    failures[job.device] = FormatError(f'Format of {job.device} failed after {job.elapsed:.0f} seconds: '
+                                                       f'{job.output}')
+                else:
+                    logger.log(f'Formatted {job.device} in {job.elapsed:.0f} seconds')
+            elif time.monotonic() >= deadline:
+                running.remove(job)
+                failures[job.device] = FormatError(f'Format of {job.device} did not complete within {timeout} seconds')
+            else:
+                # mkfs writes its progress as it goes, the last line is the most recent
+                progress = job.output.splitlines()[-1:] or ['starting']
+                logger.debug(f'Formatting {job.device} ({job.elapsed:.0f}s): {progress[0]}')
+
+        if running:
+            time.sleep(FORMAT_POLL_INTERVAL)
+
+    for err in failures.values():
+        logger.critical(str(err))
+
+    return failures
@@ -1,7 +1,9 @@
 """Linode Instance resource definition for Stackzilla."""
 import os
 import re
+from ipaddress import ip_address
 from tempfile import mkstemp
+from time import time
 from typing import Any, List
 
 from linode_api4 import LinodeClient
@@ -13,11 +15,21 @@ from stackzilla.resource.base import ResourceVersion, StackzillaResource
 from stackzilla.resource.compute import (SSHAddress, SSHCredentials,
                                          StackzillaCompute)
 from stackzilla.resource.compute.exceptions import SSHConnectError
-from stackzilla.resource.exceptions import (ResourceCreateFailure,
+from stackzilla.resource.exceptions import (AttributeModifyFailure,
+                                            ResourceCreateFailure,
                                             ResourceVerifyError)
 from stackzilla.resource.ssh_key import StackzillaSSHKey
 
+from .client import get_client, verify_tokens
+from .journal import (JournalEntry, OperationJournal,
+                      backfill_pending_operation)
+from .tags import LINODES, TagChangeError, save_tags
 from .utils import LINODE_IMAGE_TYPES, LINODE_INSTANCE_TYPES, LINODE_REGIONS
+from .warm_pool import (WarmPool, WarmPoolError, add_pool_user, get_warm_pool,
+                        release_pool_user)
+
+# Number of seconds to wait for SSH to become available on a new instance
+SSH_WAIT_TIMEOUT = 300
 
 
 class LinodeInstance(StackzillaCompute):
@@ -40,16 +52,50 @@ class LinodeInstance(StackzillaCompute):
     private_ip = StackzillaAttribute(default=False, choices=[True, False])
     volumes = StackzillaAttribute()
 
+    # Set by the provider while a create is in-flight. An interrupted create leaves this set in the database,
+    # which the next apply sees as a modification and resumes via pending_operation_modified().
+    pending_operation = StackzillaAttribute(default=None)
+
     token = None
 
-    def __init__(self):
-        """Setup logger and Linode API."""
-        super().__init__()
-        self._logger = ProviderLogger(provider_name='linode.instance', resource_name=self.path())
-        self.api = LinodeClient(self.token)
+    # Optional pool of tokens (for the same account) to spread API calls across
+    tokens = None
+
+    # Number of booted, SSH-ready instances to keep on standby for each (region, type, image).
+    # When non-zero, create() claims a standby instance instead of creating one, and the pool is refilled in the background.
+    warm_pool_size = 0
+
+    @property
+    def _logger(self) -> ProviderLogger:
+        """The logger for this resource. Built on access, so that it is not held by every instance."""
+        return ProviderLogger(provider_name='linode.instance', resource_name=self.path())
+
+    @property
+    def _journal(self) -> OperationJournal:
+        """The journal of in-flight operations for this resource."""
+        return OperationJournal(resource_path=self.path())
+
+    @property
+    def api(self) -> LinodeClient:
+        """The Linode API client, shared with every other resource on the same token.
+
+        All operations for this instance stay on the same token within the pool.
+        """
+        return get_client(token=self.token, tokens=self.tokens, key=self.path())
 
     def create(self) -> None:
         """Called when the resource is created."""
+        # Clean up an instance whose creation was interrupted during a previous apply
+        entry = self._journal.pending()
+        if entry:
+            self._discard_journaled_instance(entry=entry)
+
+        # Claim an already booted instance from the warm pool, rather than waiting on a new one
+        if self.warm_pool_size:
+            add_pool_user(path=self.path(), region=self.region, ltype=self.type, image=self.image)
+            if self._claim_warm_instance():
+                return
+
         self._logger.debug(message=f'Starting instance creation {self.label}')
 
         create_args = {
@@ -95,25 +141,211 @@ class LinodeInstance(StackzillaCompute):
         if tmp_file_name:
             os.unlink(tmp_file_name)
 
+        entry = self._begin_wait(instance=instance, password=password)
+        self._complete_create(entry=entry)
+
+    def _begin_wait(self, instance: Instance, password: str, phase: str='wait_for_ssh') -> JournalEntry:
+        """Journal the first pending phase for a new instance, and persist the instance to the database.
+
+        The journal covers the window before the database write, so that an interrupted apply deletes
+        the instance rather than leaking it. The pending_operation attribute covers the rest, so that an
+        interrupted apply resumes the create.
+
+        Args:
+            instance (Instance): The new instance
+            password (str): Root password for the new instance
+            phase (str, optional): The first pending phase. Defaults to 'wait_for_ssh'.
+
+        Returns:
+            JournalEntry: The journaled phase
+        """
         self.root_password = password
         self.instance_id = instance.id
         self.ipv4 = instance.ipv4
         self.ipv6 = instance.ipv6
 
-        # Persist this resource to the database
+        entry = self._journal_phase(phase=phase)
+
+        # Persist this resource to the database, so that it is deleted along with the blueprint, even if a later phase fails
         super().create()
 
-        # Wait up to two minutes for the server to come online
+        return entry
+
+    def _journal_phase(self, phase: str) -> JournalEntry:
+        """Journal the pending phase of the create.
+
+        Args:
+            phase (str): The phase that is now pending
+
+        Returns:
+            JournalEntry: The journaled phase
+        """
+        entry = self._journal.record(entity_id=self.instance_id, phase=phase, timeout=SSH_WAIT_TIMEOUT)
+        self.pending_operation = phase
+        return entry
+
+    def _complete_create(self, entry: JournalEntry, resumed: bool=False) -> None:
+        """Carry a new instance through the remaining (journaled) phases of creation.
+
+        Args:
+            entry (JournalEntry): The currently pending phase
+            resumed (bool, optional): True if the create was interrupted during a previous apply. Defaults to False.
+
+        Raises:
+            WarmPoolError: Raised if a claimed warm instance could not be handed over (only when not resumed)
+            ResourceCreateFailure: Raised if any of the phases fail. The failed phase is resumed by the next apply.
+        """
+        if entry.phase == 'hand_over':
+            try:
+                self._hand_over()
+            except WarmPoolError as err:
+                if not resumed:
+                    raise
+
+                # A completed hand over revokes the pool key, so an interrupted one may have finished already.
+                # The SSH wait below (with the new credentials) decides.
+                self._logger.warning(f'Unable to repeat the hand over of instance {self.instance_id}: {err}')
+
+            entry = self._journal_phase(phase='allocate_ip' if self.private_ip else 'wait_for_ssh')
+            self.update()
+
+        if entry.phase == 'allocate_ip':
+            self._allocate_private_ip()
+            entry = self._journal_phase(phase='wait_for_ssh')
+            self.update()
+
+        self._wait_for_ssh(timeout=entry.remaining())
+
+    def _claim_warm_instance(self) -> bool:
+        """Claim an instance from the warm pool and hand it over to this resource.
+
+        Raises:
+            ResourceCreateFailure: Raised if the claimed instance could not be set up or discarded
+
+        Returns:
+            bool: True if an instance was claimed, False if none were available (or the claimed one was discarded)
+        """
+        pool = self._warm_pool()
+        instance = pool.claim(label=self.label, group=self.group, tags=self.tags)
+
+        # Replace the claimed instance (or top up an empty pool) in the background
+        pool.refill_async()
+
+        if instance is None:
+            self._logger.debug(message='No warm instances available')
+            return False
+
+        # Journal and persist the claimed instance straight away, so it is never lost if a later phase fails
+        entry = self._begin_wait(instance=instance, password=Instance.generate_root_password(), phase='hand_over')
+
+        try:
+            self._complete_create(entry=entry)
+        except WarmPoolError as err:
+            self._logger.warning(f'Discarding warm instance {instance.id}: {err}')
+            self._discard_warm_instance(instance=instance)
+            return False
+
+        return True
+
+    def _warm_pool(self) -> WarmPool:
+        """The shared warm pool for this instance's (region, type, image)."""
+        return get_warm_pool(client=self.api, region=self.region, ltype=self.type, image=self.image,
+                             size=self.warm_pool_size)
+
+    def _hand_over(self) -> None:
+        """Swap the pool credentials on a claimed warm instance for a new root password and the blueprint's SSH key.
+
+        Raises:
+            WarmPoolError: Raised if the credentials could not be replaced
+        """
+        public_key = None
+        if self.ssh_key:
+            public_key = self.ssh_key.from_db().public_key.decode('utf-8')
+
+        self._warm_pool().hand_over(instance=Instance(client=self.api, id=self.instance_id),
+                                    root_password=self.root_password, public_key=public_key)
+
+    def _allocate_private_ip(self) -> None:
+        """Allocate a private IP to a claimed warm instance, unless a resumed create already did.
+
+        Raises:
+            ResourceCreateFailure: Raised if the address could not be allocated
+        """
+        instance = Instance(client=self.api, id=self.instance_id)
+
+        try:
+            if not any(ip_address(address).is_private for address in instance.ipv4):
+                self.api.networking.ip_allocate(instance, public=False)
+                instance.invalidate()
+        except ApiError as err:
+            self._logger.critical(f'Instance creation failed: {err}')
+            raise ResourceCreateFailure(reason=str(err), resource_name=self.path()) from err
+
+        self.ipv4 = instance.ipv4
+
+    def _discard_warm_instance(self, instance: Instance) -> None:
+        """Delete a claimed warm instance which could not be handed over, and remove it from the database.
+
+        Args:
+            instance (Instance): The claimed instance
+
+        Raises:
+            ResourceCreateFailure: Raised if the instance could not be deleted. It stays in the database
+                                   (with its hand over pending), so it is still deleted along with the blueprint.
+        """
+        try:
+            instance.delete()
+        except ApiError as err:
+            self._logger.critical(f'Unable to discard warm instance {instance.id}: {err}')
+            raise ResourceCreateFailure(reason=str(err), resource_name=self.path()) from err
+
+        self._journal.clear()
+        super().delete()
+        self.pending_operation = None
+
+    def _discard_journaled_instance(self, entry: JournalEntry) -> None:
+        """Delete an instance whose creation was interrupted before it was persisted to the database.
+
+        The root password is only ever persisted along with the resource, so the create can not be resumed.
+
+        Args:
+            entry (JournalEntry): The journaled operation
+
+        Raises:
+            ResourceCreateFailure: Raised if the journaled instance could not be deleted
+        """
+        self._logger.log(f'Deleting instance {entry.entity_id}, its creation was interrupted before it was saved')
+
+        try:
+            Instance(client=self.api, id=entry.entity_id).delete()
+        except ApiError as err:
+            if err.status != 404:
+                self._logger.critical(f'Unable to delete journaled instance {entry.entity_id}: {err}')
+                raise ResourceCreateFailure(reason=str(err), resource_name=self.path()) from err
+
+        self._journal.clear()
+
+    def _wait_for_ssh(self, timeout: int) -> None:
+        """Wait for the new instance to come online, then mark the create as complete.
+
+        Args:
+            timeout (int): Number of seconds to wait for SSH to become available
+
+        Raises:
+            ResourceCreateFailure: Raised if SSH never became available. The wait is resumed by the next apply.
+        """
         try:
-            self._logger.debug(message=f'Waiting up to 5 minutes for SSH to become available on {self.ipv4}')
-            self.wait_for_ssh(retry_count=60, retry_delay=5)
+            self._logger.debug(message=f'Waiting up to {timeout} seconds for SSH to become available on {self.ipv4}')
+            self.wait_for_ssh(retry_count=max(timeout // 5, 1), retry_delay=5)
         except SSHConnectError as exc:
             self._logger.critical(f'Instance creation failed: {str(exc)}')
             raise ResourceCreateFailure(reason='Unable to establish SSH connection.', resource_name=self.path()) from exc
 
-        self._logger.debug(message=f'Instance creation complete {self.instance_id}: {self.ipv4 =} | {self.ipv6 =}')
-
+        self.pending_operation = None
+        self.update()
+        self._journal.clear()
 
+        self._logger.debug(message=f'Instance creation complete {self.instance_id}: {self.ipv4 =} | {self.ipv6 =}')
 
     def delete(self) -> None:
         """Delete a previously created instance."""
@@ -121,12 +353,24 @@ class LinodeInstance(StackzillaCompute):
 
         instance = Instance(client=self.api, id=self.instance_id)
         instance.delete()
+        self._journal.clear()
+
+        # Stop paying for the standby instances once nothing else uses the warm pool
+        try:
+            release_pool_user(client=self.api, path=self.path())
+        except WarmPoolError as err:
+            self._logger.critical(f'Unable to drain the warm pool: {err}')
 
         # Delete the resource from the database
         super().delete()
 
         self._logger.debug(message='Deletion complete')
 
+    def load_from_db(self, silent_fail: bool=False):
+        """Import all of the attribute values from the database."""
+        backfill_pending_operation(resource=self)
+        super().load_from_db(silent_fail=silent_fail)
+
     def depends_on(self) -> List['StackzillaResource']:
         """Required to be overridden."""
         dependencies = []
@@ -159,10 +403,13 @@ class LinodeInstance(StackzillaCompute):
 
     def verify(self) -> None:
         """Verify instance parameters."""
-        # Make sure the user declared a token to use when authenticating with Linode
-        if self.token is None:
+        # Make sure the user declared a usable token to authenticate with Linode
+        verify_tokens(resource_name=self.path(), token=self.token, tokens=self.tokens)
+
+        # The pending operation is tracked by the provider, it can not be declared in the blueprint
+        if self.pending_operation is not None:
             err = ResourceVerifyError(resource_name=self.path())
-            err.add_attribute_error(name='token', error='not declared')
+            err.add_attribute_error(name='pending_operation', error='Set by the provider, must not be declared')
             raise err
 
         # Make sure that the label only contains numbers, letters, underscores, dashes, and periods
@@ -177,6 +424,31 @@ class LinodeInstance(StackzillaCompute):
     ##############################################################
     # Modification Methods
     ##############################################################
+    def pending_operation_modified(self, previous_value: Any, new_value: Any) -> None:
+        """Resume a create which was interrupted during a previous apply.
+
+        Args:
+            previous_value (Any): The phase the create was interrupted in
+            new_value (Any): Always None, the blueprint never declares a pending operation
+
+        Raises:
+            AttributeModifyFailure: Raised if the create could not be completed. It is resumed again by the next apply.
+        """
+        self._logger.log(f'Resuming creation of instance {self.instance_id} ({previous_value} -> {new_value})')
+
+        entry = self._journal.pending()
+        if entry is None:
+            entry = JournalEntry(entity_id=self.instance_id, phase=previous_value, timeout=SSH_WAIT_TIMEOUT,
+                                 deadline=time() + SSH_WAIT_TIMEOUT)
+
+        try:
+            self._complete_create(entry=entry, resumed=True)
+        except ResourceCreateFailure as exc:
+            raise AttributeModifyFailure(attribute_name='pending_operation', reason=exc.reason) from exc
+
+        # The create handlers never ran for the interrupted create
+        self.on_create_done.invoke(sender=self)
+
     def type_modified(self, previous_value: Any, new_value: Any) -> None:
         """Handle when the instance type is modified.
 
@@ -222,17 +494,16 @@ class LinodeInstance(StackzillaCompute):
         Args:
             previous_value (Any): The previous tags value.
             new_value (Any): New tags value.
+
+        Raises:
+            AttributeModifyFailure: Raised if the tags could not be updated
         """
         self._logger.debug(message=f'Updating tags from {previous_value} to {new_value}')
 
-        instance = Instance(client=self.api, id=self.instance_id)
-
-        # Short circuit out
-        if new_value == instance.tags:
-            return
-
-        instance.tags = new_value
-        instance.save()
+        try:
+            save_tags(client=self.api, kind=LINODES, entity_id=self.instance_id, tags=new_value)
+        except TagChangeError as exc:
+            raise AttributeModifyFailure(attribute_name='tags', reason=str(exc)) from exc
 
     ##############################################################
     # Event Handlers
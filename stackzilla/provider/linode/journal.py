@@ -0,0 +1,102 @@
+"""Journal of in-flight Linode operations, used to resume interrupted applies."""
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from stackzilla.database.base import StackzillaDB
+from stackzilla.database.exceptions import (AttributeNotFound,
+                                            MetadataKeyNotFound,
+                                            ResourceNotFound)
+from stackzilla.resource.base import StackzillaResource
+
+
+@dataclass
+class JournalEntry:
+    """A single in-flight operation against a Linode entity.
+
+    Entries are stored in plain text, so they must never carry secrets.
+    """
+
+    entity_id: int
+    phase: str
+    timeout: int
+    deadline: float
+
+    def remaining(self) -> int:
+        """The number of seconds left before the deadline. Always at least one, so the wait is checked once more."""
+        return max(int(self.deadline - time.time()), 1)
+
+
+class OperationJournal:
+    """Journal of the in-flight operation for a single resource.
+
+    Entries are persisted in the metadata table of the Stackzilla database so that they
+    survive a crash of the process performing the apply.
+    """
+
+    KEY_PREFIX = 'linode.journal'
+
+    def __init__(self, resource_path: str):
+        """Setup the journal for a resource.
+
+        Args:
+            resource_path (str): The path of the resource the journal is for
+        """
+        self._key = f'{self.KEY_PREFIX}.{resource_path}'
+
+    def record(self, entity_id: int, phase: str, timeout: int) -> JournalEntry:
+        """Record that an operation has entered a new phase.
+
+        Args:
+            entity_id (int): ID of the Linode entity being operated on
+            phase (str): The phase of the operation that is now pending
+            timeout (int): Number of seconds the phase is allowed to take
+
+        Returns:
+            JournalEntry: The newly recorded entry
+        """
+        entry = JournalEntry(entity_id=entity_id, phase=phase, timeout=timeout, deadline=time.time() + timeout)
+        StackzillaDB.db.set_metadata(key=self._key, value=asdict(entry))
+        return entry
+
+    def pending(self) -> Optional[JournalEntry]:
+        """Fetch the pending operation, if any.
+
+        The pending operation is only fetched to resume it. If its deadline passed during a previous
+        apply, the phase is re-armed with its full timeout, rather than being given a single second.
+
+        Returns:
+            Optional[JournalEntry]: The pending operation, or None if nothing is in-flight
+        """
+        try:
+            value = StackzillaDB.db.get_metadata(key=self._key)
+        except MetadataKeyNotFound:
+            return None
+
+        entry = JournalEntry(**value)
+        if entry.deadline <= time.time():
+            entry = self.record(entity_id=entry.entity_id, phase=entry.phase, timeout=entry.timeout)
+
+        return entry
+
+    def clear(self) -> None:
+        """Remove the pending operation from the journal."""
+        try:
+            StackzillaDB.db.delete_metadata(key=self._key)
+        except MetadataKeyNotFound:
+            pass
+
+
+def backfill_pending_operation(resource: StackzillaResource) -> None:
+    """Add the pending_operation attribute to a resource persisted before the attribute existed.
+
+    Args:
+        resource (StackzillaResource): The resource about to be loaded from the database
+    """
+    try:
+        StackzillaDB.db.get_attribute(resource=resource, name='pending_operation')
+    except AttributeNotFound:
+        StackzillaDB.db.create_attribute(resource=resource, name='pending_operation', value=None)
+    except ResourceNotFound:
+        # Nothing to migrate, the resource was never persisted
+        pass
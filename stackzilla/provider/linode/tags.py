@@ -0,0 +1,62 @@
+"""Tagging of Linode instances and volumes, in a single request per entity."""
+from typing import List, Optional, Tuple
+
+from linode_api4 import LinodeClient
+from linode_api4.errors import ApiError
+from linode_api4.objects.linode import Instance
+from linode_api4.objects.tag import Tag
+from linode_api4.objects.volume import Volume
+
+
+# Entity kinds, named after the matching fields of the tags endpoint
+LINODES = 'linodes'
+VOLUMES = 'volumes'
+
+_ENTITY_CLASSES = {LINODES: Instance, VOLUMES: Volume}
+
+
+class TagChangeError(Exception):
+    """Raised when the tags of an entity could not be updated."""
+
+
+def save_tags(client: LinodeClient, kind: str, entity_id: int, tags: Optional[List[str]]) -> None:
+    """Replace the tags of an instance or volume.
+
+    Only the tags are sent, so the entity does not have to be fetched before it is saved.
+
+    Args:
+        client (LinodeClient): Client to apply the change with
+        kind (str): LINODES or VOLUMES
+        entity_id (int): ID of the instance or volume
+        tags (Optional[List[str]]): Tags which should be applied to the entity
+
+    Raises:
+        TagChangeError: Raised if the tags of the entity could not be updated
+    """
+    entity_class = _ENTITY_CLASSES[kind]
+
+    try:
+        client.put(entity_class.api_endpoint, model=entity_class(client=client, id=entity_id), data={'tags': tags or []})
+    except ApiError as err:
+        raise TagChangeError(f'Unable to update tags: {err}') from err
+
+
+def tagged_entities(client: LinodeClient, tag: str) -> Tuple[List[Instance], List[Volume]]:
+    """Query all of the instances and volumes carrying a tag, in a single request.
+
+    Args:
+        client (LinodeClient): Client to query with
+        tag (str): The tag to query
+
+    Returns:
+        Tuple[List[Instance], List[Volume]]: The tagged instances and volumes
+    """
+    instances = []
+    volumes = []
+    for entity in Tag(client, tag).objects:
+        if isinstance(entity, Instance):
+            instances.append(entity)
+        elif isinstance(entity, Volume):
+            volumes.append(entity)
+
+    return instances, volumes
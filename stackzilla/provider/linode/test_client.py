@@ -0,0 +1,116 @@
+"""Tests for the Linode API client management module."""
+import pytest
+from stackzilla.resource.exceptions import ResourceVerifyError
+
+from stackzilla.provider.linode import client
+from stackzilla.provider.linode.client import (RateLimiter, TokenPool,
+                                               get_client, resolve_tokens,
+                                               verify_tokens)
+
+
+class FakeClock:
+    """Stand-in for time.monotonic() and time.sleep() which only moves when slept."""
+
+    def __init__(self):
+        """Start the clock at zero."""
+        self.now = 0.0
+        self.slept = []
+
+    def monotonic(self) -> float:
+        """Fetch the current time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock."""
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(monkeypatch):
+    """Replace the clock used by the rate limiter."""
+    fake = FakeClock()
+    monkeypatch.setattr(client.time, 'monotonic', fake.monotonic)
+    monkeypatch.setattr(client.time, 'sleep', fake.sleep)
+    return fake
+
+def test_rate_limiter_under_limit(clock):
+    """Verify that requests within the limit never wait."""
+    limiter = RateLimiter(limit=3, window=60)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert clock.slept == []
+    assert limiter.in_window == 3
+
+def test_rate_limiter_waits_for_window(clock):
+    """Verify that a request over the limit waits for the oldest request to age out."""
+    limiter = RateLimiter(limit=2, window=60)
+
+    limiter.acquire()
+    clock.now = 10
+    limiter.acquire()
+
+    # The third request has to wait until the first is 60 seconds old
+    limiter.acquire()
+    assert clock.slept == [50]
+    assert clock.now == 60
+    assert limiter.in_window == 2
+
+def test_token_pool_is_sticky():
+    """Verify that a key always maps onto the same client."""
+    pool = TokenPool(tokens=['alpha', 'beta', 'charlie'])
+
+    for key in ['..instance.MyServer', '..volume.MyVolume']:
+        assert pool.client_for(key) is pool.client_for(key)
+
+def test_token_pool_spreads_keys():
+    """Verify that keys are spread across all of the tokens."""
+    pool = TokenPool(tokens=['alpha', 'beta', 'charlie'])
+
+    used = {pool.client_for(f'..blueprint.Resource{index}').token for index in range(300)}
+    assert used == {'alpha', 'beta', 'charlie'}
+
+def test_token_pool_clients_have_own_limiters():
+    """Verify that each token accounts for its own requests."""
+    pool = TokenPool(tokens=['alpha', 'beta'])
+    assert pool.clients[0].limiter is not pool.clients[1].limiter
+
+def test_token_limiter_shared_across_pools():
+    """Verify that a token accounts for its requests in one place, whichever pools it is a member of."""
+    alone = TokenPool(tokens=['alpha'])
+    pooled = TokenPool(tokens=['alpha', 'beta'])
+    assert alone.clients[0].limiter is pooled.clients[0].limiter
+
+def test_resolve_tokens():
+    """Verify that the single token and pool declarations are combined."""
+    assert not resolve_tokens(token=None, tokens=None)
+    assert resolve_tokens(token='alpha', tokens=None) == ['alpha']
+    assert resolve_tokens(token='alpha', tokens=['beta', 'alpha']) == ['alpha', 'beta']
+    assert resolve_tokens(token=None, tokens=['alpha', '', 'beta']) == ['alpha', 'beta']
+
+def test_resolve_tokens_rejects_string():
+    """Verify that a single string is not split into single character tokens."""
+    with pytest.raises(TypeError):
+        resolve_tokens(token=None, tokens='alpha')
+
+def test_get_client_shares_clients():
+    """Verify that resources on the same token share a client."""
+    first = get_client(token='alpha', tokens=['beta'], key='..instance.MyServer')
+    second = get_client(token='alpha', tokens=['beta'], key='..instance.MyServer')
+    assert first is second
+
+def test_get_client_no_tokens():
+    """Verify that a missing token is reported."""
+    with pytest.raises(RuntimeError):
+        get_client(token=None, tokens=None, key='..instance.MyServer')
+
+def test_verify_tokens():
+    """Verify that a missing token, or a string in place of a token list, fails verification."""
+    verify_tokens(resource_name='..instance.MyServer', token='alpha', tokens=None)
+    verify_tokens(resource_name='..instance.MyServer', token=None, tokens=['alpha'])
+
+    for token, tokens in [(None, None), (None, []), ('alpha', 'beta')]:
+        with pytest.raises(ResourceVerifyError):
+            verify_tokens(resource_name='..instance.MyServer', token=token, tokens=tokens)
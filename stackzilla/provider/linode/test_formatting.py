@@ -0,0 +1,111 @@
+"""Tests for formatting volumes on the instances they are attached to."""
+import pytest
+from stackzilla.logger.provider import ProviderLogger
+from stackzilla.utils.ssh import CmdResult
+
+from stackzilla.provider.linode import formatting
+from stackzilla.provider.linode.formatting import (FormatError, FormatJob,
+                                                   format_command,
+                                                   run_format_jobs)
+
+
+class FakeSSHClient:  # pylint: disable=too-few-public-methods
+    """Stand-in for the SSH client which answers commands from a table of results."""
+
+    def __init__(self, results):
+        """Setup the results, keyed by the start of each command."""
+        self._results = results
+        self.commands = []
+
+    def run_command(self, command, sudo=False, use_pty=False):  # pylint: disable=unused-argument
+        """Answer a command from the table, succeeding with no output if it is not listed."""
+        self.commands.append(command)
+        for prefix, results in self._results.items():
+            if command.startswith(prefix):
+                return results.pop(0) if len(results) > 1 else results[0]
+
+        return CmdResult(stdout='', exit_code=0)
+
+
+@pytest.fixture(autouse=True)
+def fixture_no_sleep(monkeypatch):
+    """Never actually wait between polls."""
+    monkeypatch.setattr(formatting.time, 'sleep', lambda _: None)
+
+@pytest.fixture(name='logger')
+def fixture_logger():
+    """Provide a logger for progress reporting."""
+    return ProviderLogger(provider_name='linode.volume', resource_name='..test.Volume')
+
+def test_format_command():
+    """Verify the mkfs options for each file system, with and without fast formatting."""
+    assert format_command('ext4', '/dev/sdc', fast=False) == 'mkfs.ext4 -F /dev/sdc'
+    assert format_command('ext4', '/dev/sdc', fast=True) == \
+        'mkfs.ext4 -F -E lazy_itable_init=1,lazy_journal_init=1,nodiscard /dev/sdc'
+    assert format_command('xfs', '/dev/sdc', fast=True) == 'mkfs.xfs -f -K /dev/sdc'
+    assert format_command('btrfs', '/dev/sdc', fast=False) == 'mkfs.btrfs -f /dev/sdc'
+
+def test_run_success(logger):
+    """Verify that the format is polled until its exit status shows up."""
+    ssh_client = FakeSSHClient({'cat /tmp/stackzilla-format-sdc.status': [CmdResult(stdout='', exit_code=1),
+                                                                          CmdResult(stdout='0\n', exit_code=0)]})
+    job = FormatJob(ssh_client=ssh_client, device='/dev/sdc', file_system_type='ext4', fast=True)
+
+    job.run(logger=logger)
+    assert job.exit_code == 0
+
+def test_start_failure(logger):
+    """Verify that a format which could not be launched fails straight away, without polling."""
+    ssh_client = FakeSSHClient({'nohup': [CmdResult(stdout='', exit_code=127, stderr='sh: not found')]})
+    job = FormatJob(ssh_client=ssh_client, device='/dev/sdc', file_system_type='xfs', fast=False)
+
+    with pytest.raises(FormatError, match='not found'):
+        job.run(logger=logger)
+
+    assert not [command for command in ssh_client.commands if command.startswith('cat')]
+
+def test_run_failure(logger):
+    """Verify that a non-zero mkfs exit status fails the format."""
+    ssh_client = FakeSSHClient({'cat /tmp/stackzilla-format-sdc.status': [CmdResult(stdout='1\n', exit_code=0)]})
+    job = FormatJob(ssh_client=ssh_client, device='/dev/sdc', file_system_type='btrfs', fast=False)
+
+    with pytest.raises(FormatError, match='failed'):
+        job.run(logger=logger)
+
+def test_run_timeout(logger):
+    """Verify that a format which never completes is reported once the timeout passes."""
+    job = FormatJob(ssh_client=FakeSSHClient({}), device='/dev/sdc', file_system_type='ext4', fast=False)
+
+    with pytest.raises(FormatError, match='did not complete'):
+        job.run(logger=logger, timeout=0)
+
+def test_missing_tool(logger):
+    """Verify that a format fails straight away when the mkfs tool is not installed on the host."""
+    ssh_client = FakeSSHClient({'command -v mkfs.xfs': [CmdResult(stdout='', exit_code=1)]})
+    job = FormatJob(ssh_client=ssh_client, device='/dev/sdc', file_system_type='xfs', fast=True)
+
+    with pytest.raises(FormatError, match='xfsprogs'):
+        job.run(logger=logger)
+
+    assert not [command for command in ssh_client.commands if command.startswith('nohup')]
+
+def test_run_format_jobs(logger):
+    """Verify that every format is started before any is waited on, and that failures are reported per device."""
+    ssh_client = FakeSSHClient({'cat /tmp/stackzilla-format-sdc.status': [CmdResult(stdout='', exit_code=1),
+                                                                          CmdResult(stdout='0\n', exit_code=0)],
+                                'cat /tmp/stackzilla-format-sdd.status': [CmdResult(stdout='1\n', exit_code=0)],
+                                'command -v mkfs.btrfs': [CmdResult(stdout='', exit_code=1)]})
+    jobs = [FormatJob(ssh_client=ssh_client, device='/dev/sdc', file_system_type='ext4', fast=True),
+            FormatJob(ssh_client=ssh_client, device='/dev/sdd', file_system_type='xfs', fast=True),
+            FormatJob(ssh_client=ssh_client, device='/dev/sde', file_system_type='btrfs', fast=True)]
+
+    failures = run_format_jobs(jobs=jobs, logger=logger)
+
+    assert sorted(failures) == ['/dev/sdd', '/dev/sde']
+    assert 'failed' in str(failures['/dev/sdd'])
+    assert 'not installed' in str(failures['/dev/sde'])
+
+    launches = [index for index, command in enumerate(ssh_client.commands) if command.startswith('nohup')]
+    polls = [index for index, command in enumerate(ssh_client.commands) if command.startswith('cat')]
+    assert len(launches) == 2
+    assert max(launches) < min(polls)
@@ -0,0 +1,187 @@
+"""Tests for resuming interrupted Linode instance creations."""
+# pylint: disable=attribute-defined-outside-init
+import pytest
+from stackzilla.database.base import StackzillaDB
+from stackzilla.database.sqlite import StackzillaSQLiteDB
+from stackzilla.resource.compute.exceptions import SSHConnectError
+from stackzilla.resource.exceptions import AttributeModifyFailure
+
+from stackzilla.provider.linode import instance as instance_module
+from stackzilla.provider.linode.instance import LinodeInstance
+from stackzilla.provider.linode.warm_pool import WarmPoolError
+
+
+class FakeInstance:  # pylint: disable=too-few-public-methods
+    """Stand-in for the linode_api4 Instance object which records the deletes."""
+
+    deleted = []
+
+    def __init__(self, client, id):  # pylint: disable=redefined-builtin
+        """Setup the instance."""
+        self._client = client
+        self.id = id
+        self.ipv4 = ['192.0.2.1']
+        self.ipv6 = '2001:db8::1/128'
+
+    def delete(self):
+        """Delete the instance."""
+        FakeInstance.deleted.append(self.id)
+
+
+class FakeLinodeGroup:  # pylint: disable=too-few-public-methods
+    """Stand-in for the linode group of the API client."""
+
+    def instance_create(self, **_):
+        """Create a new instance."""
+        return FakeInstance(client=None, id=200), 'password'
+
+
+class FakeClient:  # pylint: disable=too-few-public-methods
+    """Stand-in for the Linode API client."""
+
+    def __init__(self):
+        """Setup the linode group."""
+        self.linode = FakeLinodeGroup()
+
+
+class Server(LinodeInstance):  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """Instance under test."""
+
+    token = 'token'
+
+    def __init__(self):
+        """Setup the blueprint values."""
+        super().__init__()
+        self.region = 'us-east'
+        self.type = 'g6-nanode-1'
+        self.image = 'linode/debian11'
+        self.private_ip = True
+
+
+@pytest.fixture(autouse=True, name='database')
+def fixture_database():
+    """Provide an in-memory Stackzilla database."""
+    database = StackzillaSQLiteDB(name='linode-instance')
+    database.create(in_memory=True)
+    yield database
+    database.close()
+
+@pytest.fixture(autouse=True)
+def fixture_fake_api(monkeypatch):
+    """Route every instance API call to the fakes."""
+    FakeInstance.deleted = []
+    monkeypatch.setattr(instance_module, 'get_client', lambda **_: FakeClient())
+    monkeypatch.setattr(instance_module, 'Instance', FakeInstance)
+
+@pytest.fixture(name='server')
+def fixture_server(monkeypatch):
+    """Provide a server whose create was interrupted while waiting for SSH, and record the phases it resumes."""
+    server = Server()
+    server.instance_id = 100
+    server.root_password = 'password'
+    server.ipv4 = ['192.0.2.1']
+    server.pending_operation = 'wait_for_ssh'
+    server.create_in_db()
+
+    server.phases = []
+    monkeypatch.setattr(server, 'wait_for_ssh', lambda **_: server.phases.append('wait_for_ssh'))
+    monkeypatch.setattr(server, '_allocate_private_ip', lambda: server.phases.append('allocate_ip'))
+    return server
+
+def load(server: Server) -> Server:
+    """Load a fresh copy of a server from the database."""
+    loaded = Server()
+    loaded.load_from_db()
+    assert loaded.path() == server.path()
+    return loaded
+
+def test_resume_wait_for_ssh(server):
+    """Verify that a create interrupted while waiting for SSH is completed by the modify handler."""
+    done = []
+
+    def on_create_done(sender):
+        done.append(sender)
+
+    # Events only hold weak references to their handlers
+    server.on_create_done.attach(handler=on_create_done)
+
+    server.pending_operation_modified(previous_value='wait_for_ssh', new_value=None)
+
+    assert server.phases == ['wait_for_ssh']
+    assert done == [server]
+    assert load(server).pending_operation is None
+    assert server._journal.pending() is None  # pylint: disable=protected-access
+
+def test_resume_failure_kept_pending(server, monkeypatch):
+    """Verify that a failed resume is reported, and is resumed again by the next apply."""
+    def fail(**_):
+        raise SSHConnectError('no route to host')
+
+    monkeypatch.setattr(server, 'wait_for_ssh', fail)
+    server._journal.record(entity_id=100, phase='wait_for_ssh', timeout=300)  # pylint: disable=protected-access
+
+    with pytest.raises(AttributeModifyFailure):
+        server.pending_operation_modified(previous_value='wait_for_ssh', new_value=None)
+
+    assert load(server).pending_operation == 'wait_for_ssh'
+    assert server._journal.pending().phase == 'wait_for_ssh'  # pylint: disable=protected-access
+
+def test_resume_hand_over(server, monkeypatch):
+    """Verify that a repeated hand over which fails is only logged, and the remaining phases are carried out."""
+    def hand_over():
+        server.phases.append('hand_over')
+        raise WarmPoolError('Authentication failed')
+
+    monkeypatch.setattr(server, '_hand_over', hand_over)
+    server._journal.record(entity_id=100, phase='hand_over', timeout=300)  # pylint: disable=protected-access
+
+    server.pending_operation_modified(previous_value='hand_over', new_value=None)
+
+    assert server.phases == ['hand_over', 'allocate_ip', 'wait_for_ssh']
+    assert load(server).pending_operation is None
+
+def test_resume_allocate_ip(server):
+    """Verify that a create interrupted before its private IP was allocated carries on from there."""
+    server.pending_operation_modified(previous_value='allocate_ip', new_value=None)
+
+    assert server.phases == ['allocate_ip', 'wait_for_ssh']
+
+def test_create_discards_unsaved_instance(monkeypatch):
+    """Verify that an instance journaled before it was saved is deleted, and a new instance created in its place."""
+    server = Server()
+    monkeypatch.setattr(server, 'wait_for_ssh', lambda **_: None)
+    server._journal.record(entity_id=100, phase='wait_for_ssh', timeout=300)  # pylint: disable=protected-access
+
+    server.private_ip = False
+    server.create()
+
+    assert FakeInstance.deleted == [100]
+    assert load(server).instance_id == 200
+    assert server._journal.pending() is None  # pylint: disable=protected-access
+
+def test_journal_holds_no_secrets(server):
+    """Verify that the root password is never written to the journal."""
+    server._journal_phase(phase='wait_for_ssh')  # pylint: disable=protected-access
+
+    assert 'password' not in str(StackzillaDB.db.get_metadata(key=f'linode.journal.{server.path()}'))
+
+def test_backfill_pending_operation(server):
+    """Verify that an instance saved before pending_operation existed still loads."""
+    StackzillaDB.db.delete_attribute(resource=server, name='pending_operation')
+
+    assert load(server).pending_operation is None
+
+def test_delete_releases_warm_pool(server, monkeypatch):
+    """Verify that deleting an instance releases its warm pool, and that a failed drain does not fail the delete."""
+    released = []
+
+    def release_pool_user(client, path):  # pylint: disable=unused-argument
+        released.append(path)
+        raise WarmPoolError('Unable to delete pool members: 7')
+
+    monkeypatch.setattr(instance_module, 'release_pool_user', release_pool_user)
+
+    server.delete()
+
+    assert FakeInstance.deleted == [100]
+    assert released == [server.path()]
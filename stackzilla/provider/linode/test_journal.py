@@ -0,0 +1,62 @@
+"""Tests for the journal of in-flight Linode operations."""
+import pytest
+from stackzilla.database.sqlite import StackzillaSQLiteDB
+
+from stackzilla.provider.linode import journal
+from stackzilla.provider.linode.journal import OperationJournal
+
+
+@pytest.fixture(autouse=True, name='database')
+def fixture_database():
+    """Provide an in-memory Stackzilla database."""
+    database = StackzillaSQLiteDB(name='linode-journal')
+    database.create(in_memory=True)
+    yield database
+    database.close()
+
+def test_record_pending_clear():
+    """Verify that a recorded phase is pending until the journal is cleared."""
+    operations = OperationJournal(resource_path='..test.Volume')
+    assert operations.pending() is None
+
+    operations.record(entity_id=1, phase='wait_for_active', timeout=120)
+    entry = operations.pending()
+    assert (entry.entity_id, entry.phase, entry.timeout) == (1, 'wait_for_active', 120)
+    assert 115 < entry.remaining() <= 120
+
+    operations.clear()
+    assert operations.pending() is None
+
+    # Clearing an empty journal is harmless
+    operations.clear()
+
+def test_journals_are_per_resource():
+    """Verify that each resource has its own journal."""
+    OperationJournal(resource_path='..test.First').record(entity_id=1, phase='wait_for_ssh', timeout=300)
+
+    assert OperationJournal(resource_path='..test.Second').pending() is None
+
+def test_expired_phase_rearmed(monkeypatch):
+    """Verify that a phase which timed out during a previous apply gets its full timeout again when resumed."""
+    operations = OperationJournal(resource_path='..test.Volume')
+    operations.record(entity_id=1, phase='wait_for_attach', timeout=120)
+
+    # An hour later...
+    now = journal.time.time()
+    monkeypatch.setattr(journal.time, 'time', lambda: now + 3600)
+
+    entry = operations.pending()
+    assert entry.phase == 'wait_for_attach'
+    assert entry.remaining() == 120
+
+    # The re-armed deadline is persisted
+    assert operations.pending().deadline == entry.deadline
+
+def test_remaining_never_zero(monkeypatch):
+    """Verify that an expired entry always leaves time for one more check."""
+    entry = OperationJournal(resource_path='..test.Volume').record(entity_id=1, phase='wait_for_active', timeout=5)
+
+    now = journal.time.time()
+    monkeypatch.setattr(journal.time, 'time', lambda: now + 60)
+
+    assert entry.remaining() == 1
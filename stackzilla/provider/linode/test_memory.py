@@ -0,0 +1,150 @@
+"""Memory benchmark for planning and applying a large blueprint against a mocked Linode API.
+
+The benchmark takes over a minute, so it only runs when STACKZILLA_MEMORY_BENCHMARK is set.
+"""
+import logging
+import os
+import tracemalloc
+
+import pytest
+from stackzilla.blueprint import StackzillaBlueprint
+from stackzilla.database.sqlite import StackzillaSQLiteDB
+from stackzilla.diff import StackzillaDiff, StackzillaDiffResult
+
+from stackzilla.provider.linode import volume as volume_module
+
+pytestmark = pytest.mark.skipif(not os.environ.get('STACKZILLA_MEMORY_BENCHMARK'),
+                                reason='Set STACKZILLA_MEMORY_BENCHMARK to run the memory benchmark')
+
+# Number of resources in the benchmark blueprint
+RESOURCE_COUNT = 10000
+
+# Memory (in bytes) each resource may retain once it has been applied. Everything the framework holds
+# for a resource (the diff and the resource objects) already exists once the plan is complete, so this
+# only covers what the provider holds on to.
+RESOURCE_RETAINED_BUDGET = 256
+
+RESOURCE_TEMPLATE = '''
+class BenchmarkVolume{index}(LinodeVolume):
+    token = 'benchmark'
+
+    def __init__(self):
+        super().__init__()
+        self.label = 'benchmark-{index}-{generation}'
+        self.region = 'us-east'
+        self.size = 10
+'''
+
+
+class FakeVolume:
+    """Stand-in for the linode_api4 Volume object, which never talks to the API."""
+
+    def __init__(self, client, id):  # pylint: disable=redefined-builtin
+        """Setup a volume which is already active."""
+        self._client = client
+        self.id = id
+        self.status = 'active'
+        self.filesystem_path = '/dev/disk/by-id/scsi-0Linode_Volume_benchmark'
+        self.hardware_type = 'nvme'
+        self.linode_id = None
+        self.label = None
+
+    def invalidate(self):
+        """Nothing to refresh."""
+
+    def save(self):
+        """Nothing to save."""
+        return True
+
+
+class FakeClient:  # pylint: disable=too-few-public-methods
+    """Stand-in for the Linode API client."""
+
+    def __init__(self):
+        """Start volume IDs from an arbitrary base."""
+        self._next_id = 1000
+
+    def volume_create(self, **_):
+        """Create a new fake volume."""
+        self._next_id += 1
+        return FakeVolume(client=self, id=self._next_id)
+
+
+@pytest.fixture(name='database')
+def fixture_database():
+    """Provide an in-memory Stackzilla database."""
+    database = StackzillaSQLiteDB(name='linode-memory-benchmark')
+    database.create(in_memory=True)
+
+    # Attributes are looked up by resource and name, which is a full table scan without an index.
+    # That makes the benchmark quadratic in the number of resources, but has no bearing on the memory measured.
+    database.connection.execute('CREATE INDEX benchmark_attribute ON StackzillaAttribute (resource_id, name)')
+    yield database
+    database.close()
+
+@pytest.fixture(name='quiet')
+def fixture_quiet():
+    """Drop the INFO/DEBUG messages for every resource, rather than having the log capture hold on to them."""
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+@pytest.fixture(name='fake_api')
+def fixture_fake_api(monkeypatch):
+    """Route every volume API call to the fake client."""
+    client = FakeClient()
+    monkeypatch.setattr(volume_module, 'get_client', lambda **_: client)
+    monkeypatch.setattr(volume_module, 'Volume', FakeVolume)
+    return client
+
+def write_blueprint(path: str, generation: int) -> None:
+    """Write out the benchmark blueprint. Each generation has new labels for every volume."""
+    resources = [RESOURCE_TEMPLATE.format(index=index, generation=generation) for index in range(RESOURCE_COUNT)]
+
+    with open(os.path.join(path, '__init__.py'), 'w', encoding='utf-8') as init_file:
+        init_file.write('')
+
+    with open(os.path.join(path, 'volumes.py'), 'w', encoding='utf-8') as module_file:
+        module_file.write('from stackzilla.provider.linode.volume import LinodeVolume\n')
+        module_file.write(''.join(resources))
+
+def plan_apply(path: str) -> float:
+    """Plan the on-disk blueprint against the one in the database, then apply it.
+
+    Returns:
+        float: The memory (in bytes) retained for each resource by the apply
+    """
+    disk_blueprint = StackzillaBlueprint(path=path)
+    disk_blueprint.load()
+    disk_blueprint.verify()
+
+    db_blueprint = StackzillaBlueprint()
+    db_blueprint.load()
+
+    diff = StackzillaDiff()
+    diff.diff(source=disk_blueprint, destination=db_blueprint)
+    assert diff.result.result == StackzillaDiffResult.CONFLICT
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    diff.apply()
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Unload both blueprints, so that the next plan imports them again (as a new CLI invocation would)
+    for blueprint in (disk_blueprint, db_blueprint):
+        blueprint._importer.unload()  # pylint: disable=protected-access
+
+    return (current - baseline) / RESOURCE_COUNT
+
+def test_plan_apply_memory(database, quiet, fake_api, tmp_path):  # pylint: disable=unused-argument
+    """Verify that resources hold on to next to nothing once a 10k resource blueprint is created, then modified."""
+    # Create everything
+    write_blueprint(path=str(tmp_path), generation=0)
+    assert plan_apply(path=str(tmp_path)) < RESOURCE_RETAINED_BUDGET
+
+    # Modify the label of everything
+    write_blueprint(path=str(tmp_path), generation=1)
+    assert plan_apply(path=str(tmp_path)) < RESOURCE_RETAINED_BUDGET
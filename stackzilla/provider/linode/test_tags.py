@@ -0,0 +1,58 @@
+"""Tests for tagging instances and volumes."""
+import pytest
+from linode_api4.errors import ApiError
+from linode_api4.objects.linode import Instance
+from linode_api4.objects.volume import Volume
+
+from stackzilla.provider.linode.tags import (LINODES, VOLUMES, TagChangeError,
+                                             save_tags, tagged_entities)
+
+
+class FakeClient:
+    """Stand-in for the Linode API client which records the requests."""
+
+    def __init__(self, fail: bool=False):
+        """Setup the client, which fails every request if asked to."""
+        self.fail = fail
+        self.requests = []
+
+    def put(self, endpoint, model=None, data=None):
+        """Record a PUT request."""
+        if self.fail:
+            raise ApiError('put failed', status=500)
+
+        self.requests.append(('PUT', endpoint.format(**vars(model)), data))
+        return data
+
+    def get(self, endpoint, model=None, **_):
+        """Answer the tagged objects query with an instance, a volume and a domain."""
+        self.requests.append(('GET', endpoint.format(**vars(model)), None))
+        return {'data': [{'type': 'linode', 'data': {'id': 1}},
+                         {'type': 'volume', 'data': {'id': 2}},
+                         {'type': 'domain', 'data': {'id': 3}}],
+                'page': 1, 'pages': 1, 'results': 3}
+
+
+def test_save_tags():
+    """Verify that the tags are saved in a single request, without fetching the entity first."""
+    client = FakeClient()
+    save_tags(client=client, kind=LINODES, entity_id=1, tags=['web'])
+    save_tags(client=client, kind=VOLUMES, entity_id=2, tags=None)
+
+    assert client.requests == [('PUT', '/linode/instances/1', {'tags': ['web']}),
+                               ('PUT', '/volumes/2', {'tags': []})]
+
+def test_save_tags_failure():
+    """Verify that a failed save is reported."""
+    with pytest.raises(TagChangeError, match='put failed'):
+        save_tags(client=FakeClient(fail=True), kind=LINODES, entity_id=1, tags=['web'])
+
+def test_tagged_entities():
+    """Verify that the instances and volumes carrying a tag are found with a single query."""
+    client = FakeClient()
+
+    instances, volumes = tagged_entities(client=client, tag='web')
+
+    assert [(type(instance), instance.id) for instance in instances] == [(Instance, 1)]
+    assert [(type(volume), volume.id) for volume in volumes] == [(Volume, 2)]
+    assert client.requests == [('GET', '/tags/web', None)]
@@ -0,0 +1,250 @@
+"""Tests for resuming interrupted Linode volume creations."""
+# pylint: disable=attribute-defined-outside-init
+import pytest
+from linode_api4.errors import ApiError
+from stackzilla.database.base import StackzillaDB
+from stackzilla.database.sqlite import StackzillaSQLiteDB
+from stackzilla.resource.exceptions import (AttributeModifyFailure,
+                                            ResourceVerifyError)
+from stackzilla.utils.ssh import CmdResult
+
+from stackzilla.provider.linode import formatting
+from stackzilla.provider.linode import volume as volume_module
+from stackzilla.provider.linode.instance import LinodeInstance
+from stackzilla.provider.linode.tags import TagChangeError
+from stackzilla.provider.linode.volume import LinodeVolume
+
+
+class FakeVolume:  # pylint: disable=too-few-public-methods
+    """Stand-in for the linode_api4 Volume object."""
+
+    status = 'active'
+
+    def __init__(self, client, id):  # pylint: disable=redefined-builtin
+        """Setup a detached volume."""
+        self._client = client
+        self.id = id
+        self.filesystem_path = f'/dev/disk/by-id/scsi-0Linode_Volume_{id}'
+        self.hardware_type = 'nvme'
+        self.linode_id = None
+
+    def invalidate(self):
+        """Nothing to refresh."""
+
+    def attach(self, to_linode):
+        """Attach the volume to an instance."""
+        self.linode_id = to_linode
+
+
+class FakeClient:
+    """Stand-in for the Linode API client, with the volumes which exist on the account."""
+
+    def __init__(self, volume_ids):
+        """Setup the volumes on the account."""
+        self.volume_ids = volume_ids
+        self.created = []
+
+    def load(self, _, volume_id):
+        """Load an existing volume."""
+        if volume_id not in self.volume_ids:
+            raise ApiError('Not found', status=404)
+
+        return FakeVolume(client=self, id=volume_id)
+
+    def volume_create(self, **_):
+        """Create a new volume."""
+        volume = FakeVolume(client=self, id=400 + len(self.created))
+        self.created.append(volume.id)
+        return volume
+
+
+class Disk(LinodeVolume):  # pylint: disable=too-few-public-methods
+    """Volume under test."""
+
+    token = 'token'
+
+    def __init__(self):
+        """Setup the blueprint values."""
+        super().__init__()
+        self.region = 'us-east'
+        self.size = 10
+
+
+class Host(LinodeInstance):  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """Instance the formatted volumes are attached to."""
+
+    token = 'token'
+
+
+class DataDisk(LinodeVolume):  # pylint: disable=too-few-public-methods
+    """Volume which is formatted and mounted on the host."""
+
+    token = 'token'
+    fast_format = True
+
+    def __init__(self):
+        """Setup the blueprint values."""
+        super().__init__()
+        self.region = 'us-east'
+        self.size = 100
+        self.instance = Host
+        self.file_system_type = 'xfs'
+        self.mount_point = '/data'
+
+
+class LogDisk(DataDisk):  # pylint: disable=too-few-public-methods
+    """Sibling of DataDisk, on the same host."""
+
+    def __init__(self):
+        """Setup the blueprint values."""
+        super().__init__()
+        self.mount_point = '/logs'
+
+
+class FakeSSHClient:  # pylint: disable=too-few-public-methods
+    """Stand-in for the SSH client, where every command succeeds and every format completes straight away."""
+
+    def __init__(self):
+        """Setup the command log."""
+        self.commands = []
+
+    def run_command(self, command, sudo=False, use_pty=False):  # pylint: disable=unused-argument
+        """Run a command."""
+        self.commands.append(command)
+        return CmdResult(stdout='0\n' if command.endswith('.status') else '', exit_code=0)
+
+
+class FakeLinode:  # pylint: disable=too-few-public-methods
+    """Stand-in for the host, loaded from the database."""
+
+    instance_id = 50
+
+
+@pytest.fixture(autouse=True, name='database')
+def fixture_database():
+    """Provide an in-memory Stackzilla database."""
+    database = StackzillaSQLiteDB(name='linode-volume')
+    database.create(in_memory=True)
+    yield database
+    database.close()
+
+@pytest.fixture(autouse=True, name='client')
+def fixture_client(monkeypatch):
+    """Route every volume API call to the fake client, which holds volume 300."""
+    FakeVolume.status = 'active'
+    client = FakeClient(volume_ids=[300])
+    monkeypatch.setattr(volume_module, 'get_client', lambda **_: client)
+    monkeypatch.setattr(volume_module, 'Volume', FakeVolume)
+    monkeypatch.setattr(volume_module, 'sleep', lambda _: None)
+    monkeypatch.setattr(formatting.time, 'sleep', lambda _: None)
+    return client
+
+@pytest.fixture(name='disk')
+def fixture_disk():
+    """Provide a volume whose create was interrupted while waiting for it to become active."""
+    disk = Disk()
+    disk.volume_id = 300
+    disk.pending_operation = 'wait_for_active'
+    disk.create_in_db()
+    return disk
+
+def load() -> Disk:
+    """Load a fresh copy of the volume from the database."""
+    loaded = Disk()
+    loaded.load_from_db()
+    return loaded
+
+def test_resume_wait_for_active(disk):
+    """Verify that a create interrupted while waiting for the volume is completed by the modify handler."""
+    disk.pending_operation_modified(previous_value='wait_for_active', new_value=None)
+
+    loaded = load()
+    assert loaded.pending_operation is None
+    assert loaded.filesystem_path == '/dev/disk/by-id/scsi-0Linode_Volume_300'
+    assert disk._journal.pending() is None  # pylint: disable=protected-access
+
+def test_resume_failure_kept_pending(disk):
+    """Verify that a failed resume is reported, and is resumed again by the next apply."""
+    FakeVolume.status = 'creating'
+    disk._journal.record(entity_id=300, phase='wait_for_active', timeout=3)  # pylint: disable=protected-access
+
+    with pytest.raises(AttributeModifyFailure):
+        disk.pending_operation_modified(previous_value='wait_for_active', new_value=None)
+
+    assert load().pending_operation == 'wait_for_active'
+    assert disk._journal.pending().phase == 'wait_for_active'  # pylint: disable=protected-access
+
+def test_create_adopts_journaled_volume(client):
+    """Verify that a volume journaled before it was saved is adopted, rather than creating another one."""
+    disk = Disk()
+    disk._journal.record(entity_id=300, phase='wait_for_active', timeout=120)  # pylint: disable=protected-access
+
+    disk.create()
+
+    assert not client.created
+    assert load().volume_id == 300
+
+def test_create_replaces_missing_volume(client):
+    """Verify that a new volume is created when the journaled one no longer exists."""
+    disk = Disk()
+    disk._journal.record(entity_id=301, phase='wait_for_active', timeout=120)  # pylint: disable=protected-access
+
+    disk.create()
+
+    assert client.created == [400]
+    assert load().volume_id == 400
+
+def test_backfill_pending_operation(disk):
+    """Verify that a volume saved before pending_operation existed still loads."""
+    StackzillaDB.db.delete_attribute(resource=disk, name='pending_operation')
+
+    assert load().pending_operation is None
+
+def test_tags_failure_reported(disk, monkeypatch):
+    """Verify that tags which could not be saved fail the attribute, so that they are not persisted."""
+    def save_tags(**_):
+        raise TagChangeError('Unable to update tags: put failed')
+
+    monkeypatch.setattr(volume_module, 'save_tags', save_tags)
+
+    with pytest.raises(AttributeModifyFailure):
+        disk.tags_modified(previous_value=[], new_value=['web'])
+
+def test_fast_format_requires_file_system():
+    """Verify that fast formatting is rejected when there is no file system to format."""
+    disk = Disk()
+    disk.fast_format = True
+
+    with pytest.raises(ResourceVerifyError):
+        disk.verify()
+
+def test_sibling_formats_run_together(client):
+    """Verify that a sibling volume on the same host is created, attached and formatted along with the volume."""
+    data = DataDisk()
+    data.filesystem_path = '/dev/disk/by-id/scsi-0Linode_Volume_data'
+    ssh_client = FakeSSHClient()
+
+    data._format(ssh_client=ssh_client, linode=FakeLinode())  # pylint: disable=protected-access
+
+    # The sibling was created early, and journaled so that its own create adopts it
+    assert client.created == [400]
+    entry = LogDisk()._journal.pending()  # pylint: disable=protected-access
+    assert (entry.entity_id, entry.phase) == (400, 'wait_for_attach')
+
+    # Both formats were launched before either was waited on
+    launches = [index for index, command in enumerate(ssh_client.commands) if command.startswith('nohup')]
+    polls = [index for index, command in enumerate(ssh_client.commands) if command.startswith('cat')]
+    assert len(launches) == 2
+    assert max(launches) < min(polls)
+
+def test_created_siblings_not_formatted(client):
+    """Verify that a sibling which already exists is left to itself."""
+    log = LogDisk()
+    log.volume_id = 300
+    log.create_in_db()
+
+    data = DataDisk()
+    data.filesystem_path = '/dev/disk/by-id/scsi-0Linode_Volume_data'
+    data._format(ssh_client=FakeSSHClient(), linode=FakeLinode())  # pylint: disable=protected-access
+
+    assert not client.created
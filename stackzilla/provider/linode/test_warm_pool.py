@@ -0,0 +1,223 @@
+"""Tests for the warm pool of standby Linodes."""
+import threading
+from types import SimpleNamespace
+
+import pytest
+from linode_api4.errors import ApiError
+from pssh.exceptions import SessionError, Timeout
+from stackzilla.database.sqlite import StackzillaSQLiteDB
+
+from stackzilla.provider.linode import warm_pool
+from stackzilla.provider.linode.warm_pool import (STANDBY_GROUP, STANDBY_TAG,
+                                                  WarmPool, WarmPoolError,
+                                                  add_pool_user,
+                                                  drain_warm_pools,
+                                                  get_warm_pool,
+                                                  release_pool_user)
+
+
+class FakeInstance:  # pylint: disable=too-many-instance-attributes
+    """Stand-in for a linode_api4 Instance."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, instance_id: int, tags=None, status: str='running', fail_delete: bool=False, fail_save: bool=False):
+        """Setup the instance."""
+        self.id = instance_id
+        self.ipv4 = ['192.0.2.1']
+        self.type = SimpleNamespace(id='g6-nanode-1')
+        self.tags = tags or []
+        self.status = status
+        self.label = f'standby-{instance_id}'
+        self.group = STANDBY_GROUP
+        self.deleted = False
+        self.saved = False
+        self._fail_delete = fail_delete
+        self._fail_save = fail_save
+
+    def delete(self):
+        """Delete the instance, or fail to."""
+        if self._fail_delete:
+            raise ApiError('delete failed', status=500)
+
+        self.deleted = True
+
+    def save(self):
+        """Save the instance, or fail to."""
+        if self._fail_save:
+            raise ApiError('save failed', status=400)
+
+        self.saved = True
+
+
+class FakeLinodeGroup:  # pylint: disable=too-few-public-methods
+    """Stand-in for the linode group of the API client."""
+
+    def __init__(self, members):
+        """Setup the instances on the account."""
+        self._members = members
+        self.created = []
+
+    def instances(self, *_):
+        """List the instances on the account."""
+        return self._members
+
+    def instance_create(self, **kwargs):
+        """Create a new pool member."""
+        instance = FakeInstance(100 + len(self.created))
+        self.created.append(kwargs)
+        return instance, 'password'
+
+
+class FakeClient:  # pylint: disable=too-few-public-methods
+    """Stand-in for the Linode API client."""
+
+    def __init__(self, members):
+        """Setup the instances on the account."""
+        self.linode = FakeLinodeGroup(members)
+
+
+@pytest.fixture(autouse=True, name='database')
+def fixture_database(monkeypatch):
+    """Provide an in-memory Stackzilla database, and a pool key which is never generated."""
+    monkeypatch.setattr(warm_pool, '_pool_key', lambda: (b'private', 'public'))
+    database = StackzillaSQLiteDB(name='linode-warm-pool')
+    database.create(in_memory=True)
+    yield database
+    database.close()
+
+@pytest.fixture(name='pool')
+def fixture_pool():
+    """Provide a pool with no members."""
+    return WarmPool(client=FakeClient([]), region='us-east', ltype='g6-nanode-1', image='linode/debian11', size=2)
+
+def test_claim(pool, monkeypatch):
+    """Verify that only ready members are claimed, and that they are moved out of the pool."""
+    members = [FakeInstance(1), FakeInstance(2, tags=[STANDBY_TAG], status='booting'),
+               FakeInstance(3, tags=[STANDBY_TAG], fail_save=True), FakeInstance(4, tags=[STANDBY_TAG])]
+    monkeypatch.setattr(pool, 'members', lambda: members)
+
+    instance = pool.claim(label='web', group=None, tags=['prod'])
+
+    assert instance is members[3]
+    assert (instance.label, instance.group, instance.tags, instance.saved) == ('web', '', ['prod'], True)
+
+def test_claim_empty(pool, monkeypatch):
+    """Verify that nothing is claimed when no members are ready."""
+    monkeypatch.setattr(pool, 'members', lambda: [FakeInstance(1)])
+
+    assert pool.claim(label=None, group=None, tags=None) is None
+
+def test_refill(pool, monkeypatch):
+    """Verify that the pool is topped up, and that members are tagged once they accept SSH connections."""
+    members = [FakeInstance(1, tags=[STANDBY_TAG])]
+    monkeypatch.setattr(pool, 'members', lambda: members)
+    monkeypatch.setattr(warm_pool, '_ssh_ready', lambda host: True)
+
+    pool.refill()
+
+    created = pool._client.linode.created  # pylint: disable=protected-access
+    assert len(created) == 1
+    assert created[0]['group'] == STANDBY_GROUP
+    assert created[0]['authorized_keys'] == ['public']
+
+def test_refill_logs_failures(pool, monkeypatch):
+    """Verify that a failed refill is logged rather than killing the refill thread silently."""
+    def members():
+        raise ValueError('unexpected response')
+
+    monkeypatch.setattr(pool, 'members', members)
+    logged = []
+    monkeypatch.setattr(pool, '_logger', type('Logger', (), {'critical': lambda _, message: logged.append(message)})())
+
+    pool.refill()
+
+    assert logged == ['Pool refill failed: unexpected response']
+
+def test_stop_refill(pool, monkeypatch):
+    """Verify that stopping the pool ends a refill which is waiting on members to boot, without waiting it out."""
+    checked = threading.Event()
+
+    def ssh_ready(host):  # pylint: disable=unused-argument
+        checked.set()
+        return False
+
+    monkeypatch.setattr(warm_pool, '_ssh_ready', ssh_ready)
+    pool.refill_async()
+    assert checked.wait(timeout=5)
+
+    pool.stop_refill()
+
+    assert not pool._refill_thread.is_alive()  # pylint: disable=protected-access
+
+    # A stopped pool is never refilled again
+    pool.refill_async()
+    assert len(pool._client.linode.created) == 2  # pylint: disable=protected-access
+
+@pytest.mark.parametrize('error', [Timeout(), SessionError(), ConnectionRefusedError(), OSError('timed out')])
+def test_hand_over_connection_errors(pool, monkeypatch, error):
+    """Verify that any failure to connect to the pool member is reported as a WarmPoolError."""
+    def connect(**_):
+        raise error
+
+    monkeypatch.setattr(warm_pool, 'PSSHClient', connect)
+
+    with pytest.raises(WarmPoolError):
+        pool.hand_over(instance=FakeInstance(1), root_password='password', public_key=None)
+
+def test_drain(pool, monkeypatch):
+    """Verify that draining deletes every member and stops the pool from being refilled."""
+    members = [FakeInstance(1), FakeInstance(2)]
+    monkeypatch.setattr(pool, 'members', lambda: members)
+
+    pool.drain()
+
+    assert pool.size == 0
+    assert all(instance.deleted for instance in members)
+
+def test_drain_reports_failures(pool, monkeypatch):
+    """Verify that members which could not be deleted are reported, after the others are deleted."""
+    members = [FakeInstance(1, fail_delete=True), FakeInstance(2)]
+    monkeypatch.setattr(pool, 'members', lambda: members)
+
+    with pytest.raises(WarmPoolError, match='1'):
+        pool.drain()
+
+    assert members[1].deleted
+
+def test_release_pool_user():
+    """Verify that a pool is only drained once the last instance using it is released."""
+    members = [FakeInstance(1), FakeInstance(2)]
+    client = FakeClient(members)
+    pool = get_warm_pool(client=client, region='us-east', ltype='g6-nanode-1', image='linode/debian11', size=2)
+    add_pool_user(path='..test.First', region='us-east', ltype='g6-nanode-1', image='linode/debian11')
+    add_pool_user(path='..test.Second', region='us-east', ltype='g6-nanode-1', image='linode/debian11')
+
+    release_pool_user(client=client, path='..test.First')
+    assert not any(instance.deleted for instance in members)
+
+    release_pool_user(client=client, path='..test.Second')
+    assert all(instance.deleted for instance in members)
+    assert pool.size == 0
+
+    # Releasing an instance which never used a pool does nothing
+    release_pool_user(client=client, path='..test.Third')
+
+def test_release_pool_user_without_pool():
+    """Verify that a pool which was set up by an earlier apply is drained too."""
+    members = [FakeInstance(1)]
+    add_pool_user(path='..test.First', region='us-east', ltype='g6-nanode-1', image='linode/debian11')
+
+    release_pool_user(client=FakeClient(members), path='..test.First')
+
+    assert members[0].deleted
+
+def test_drain_warm_pools():
+    """Verify that every standby instance on the account is deleted, and the shared pools are forgotten."""
+    pool = get_warm_pool(client=None, region='us-east', ltype='g6-nanode-1', image='linode/debian11', size=2)
+    members = [FakeInstance(1), FakeInstance(2)]
+
+    drain_warm_pools(client=FakeClient(members))
+
+    assert pool.size == 0
+    assert all(instance.deleted for instance in members)
+    assert get_warm_pool(client=None, region='us-east', ltype='g6-nanode-1', image='linode/debian11', size=1) is not pool
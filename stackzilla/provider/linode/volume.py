@@ -1,22 +1,33 @@
 """Linode Volume resource definition for Stackzilla."""
-from time import sleep
-from typing import Any, List, Optional
+from time import sleep, time
+from typing import Any, Iterator, List, Optional, Type
 
 from linode_api4 import LinodeClient
 from linode_api4.errors import ApiError
 from linode_api4.objects.volume import Volume
 from stackzilla.attribute import StackzillaAttribute
+from stackzilla.database.base import StackzillaDB
+from stackzilla.database.exceptions import ResourceNotFound
 from stackzilla.events import StackzillaEvent
 from stackzilla.logger.provider import ProviderLogger
 from stackzilla.resource.base import ResourceVersion, StackzillaResource
-from stackzilla.resource.exceptions import (ResourceCreateFailure,
+from stackzilla.resource.exceptions import (AttributeModifyFailure,
+                                            ResourceCreateFailure,
                                             ResourceVerifyError)
 from stackzilla.utils.numbers import StackzillaRange
-from stackzilla.utils.ssh import CmdResult
+from stackzilla.utils.ssh import CmdResult, SSHClient
 
+from .client import get_client, verify_tokens
+from .formatting import FILE_SYSTEM_TYPES, FormatJob, run_format_jobs
 from .instance import LinodeInstance
+from .journal import (JournalEntry, OperationJournal,
+                      backfill_pending_operation)
+from .tags import VOLUMES, TagChangeError, save_tags
 from .utils import LINODE_REGIONS
 
+# Number of seconds to wait on each phase of attaching and detaching a volume
+VOLUME_WAIT_TIMEOUT = 120
+
 
 class LinodeVolume(StackzillaResource):
     """Resource definition for a Linode volume."""
@@ -33,29 +44,80 @@ class LinodeVolume(StackzillaResource):
     tags = StackzillaAttribute(required=False, modify_rebuild=False)
     instance = StackzillaAttribute(required=False, types=[LinodeInstance])
     mount_point = StackzillaAttribute(required=False, types=[str])
-    file_system_type = StackzillaAttribute(required=False, default=None, choices=['ext4', None])
+    file_system_type = StackzillaAttribute(required=False, default=None, choices=FILE_SYSTEM_TYPES + [None])
+
+    # Set by the provider while a create is in-flight. An interrupted create leaves this set in the database,
+    # which the next apply sees as a modification and resumes via pending_operation_modified().
+    pending_operation = StackzillaAttribute(required=False, default=None)
 
     # Class variables
     token = None
 
+    # Optional pool of tokens (for the same account) to spread API calls across
+    tokens = None
+
+    # Format with lazy inode table and journal initialization, and without discarding the device (see formatting.py).
+    # Only applies when the volume is first formatted, and requires file_system_type.
+    fast_format = False
+
     # Events
     size_changed_event = StackzillaEvent()
 
     def __init__(self):
-        """Setup the logger and Linode API."""
+        """Make sure a Linode API token was declared."""
         super().__init__()
-        self._logger = ProviderLogger(provider_name='linode.volume', resource_name=self.path())
 
-        # Make sure the user declared a token to use when authenticating with Linode
-        if self.token is None:
-            err = ResourceVerifyError(resource_name=self.path())
-            err.add_attribute_error(name='token', error='not declared')
-            raise err
+        # Make sure the user declared a usable token to authenticate with Linode
+        verify_tokens(resource_name=self.path(), token=self.token, tokens=self.tokens)
+
+    @property
+    def _logger(self) -> ProviderLogger:
+        """The logger for this resource. Built on access, so that it is not held by every volume."""
+        return ProviderLogger(provider_name='linode.volume', resource_name=self.path())
+
+    @property
+    def _journal(self) -> OperationJournal:
+        """The journal of in-flight operations for this resource."""
+        return OperationJournal(resource_path=self.path())
 
-        self.api = LinodeClient(self.token)
+    @property
+    def api(self) -> LinodeClient:
+        """The Linode API client, shared with every other resource on the same token.
+
+        All operations for this volume stay on the same token within the pool.
+        """
+        return get_client(token=self.token, tokens=self.tokens, key=self.path())
 
     def create(self) -> None:
         """Called when the resource is created."""
+        # Resume a volume creation that was interrupted during a previous apply
+        volume: Optional[Volume] = None
+        entry = self._journal.pending()
+        if entry:
+            volume = self._load_journaled_volume(entry=entry)
+
+        if volume is None:
+            volume = self._create_volume()
+
+            # Journal the pending wait so that an interrupted apply resumes it, rather than creating another volume
+            entry = self._journal.record(entity_id=volume.id, phase='wait_for_active', timeout=VOLUME_WAIT_TIMEOUT)
+
+        # Persist this resource to the database, so that it is deleted along with the blueprint, even if a later phase fails
+        self.volume_id = volume.id
+        self.pending_operation = entry.phase
+        super().create()
+
+        self._complete_create(volume=volume, entry=entry)
+
+    def _create_volume(self) -> Volume:
+        """Create the volume through the API.
+
+        Raises:
+            ResourceCreateFailure: Raised if the volume could not be created
+
+        Returns:
+            Volume: The new volume
+        """
         create_data = {
             'region': self.region,
             'size': self.size,
@@ -67,19 +129,108 @@ class LinodeVolume(StackzillaResource):
         if self.tags:
             create_data['tags'] = self.tags
 
-            self._logger.debug(message=f'Starting volume creation {self.label}')
+        self._logger.debug(message=f'Starting volume creation {self.label}')
+
+        try:
+            return self.api.volume_create(**create_data)
+        except ApiError as err:
+            self._logger.critical(f'Volume creation failed: {err}')
+            raise ResourceCreateFailure(reason=str(err), resource_name=self.path()) from err
+
+    def _load_journaled_volume(self, entry: JournalEntry) -> Optional[Volume]:
+        """Load the volume for a journaled operation.
+
+        Args:
+            entry (JournalEntry): The journaled operation
 
-            try:
-                volume: Volume = self.api.volume_create(**create_data)
-            except ApiError as err:
-                self._logger.critical(f'Volume creation failed: {err}')
+        Raises:
+            ResourceCreateFailure: Raised if the journaled volume could not be queried
+
+        Returns:
+            Optional[Volume]: The journaled volume, or None if it no longer exists
+        """
+        try:
+            volume: Volume = self.api.load(Volume, entry.entity_id)
+        except ApiError as err:
+            if err.status != 404:
                 raise ResourceCreateFailure(reason=str(err), resource_name=self.path()) from err
 
-        # Persist this resource to the database
-        super().create()
+            self._logger.log(f'Journaled volume {entry.entity_id} no longer exists. Creating a new volume.')
+            self._journal.clear()
+            return None
+
+        self._logger.log(f'Resuming creation of volume {entry.entity_id} ({entry.phase})')
+        return volume
 
-        # Wait for the volume to become active
-        time_left = 120
+    def _complete_create(self, volume: Volume, entry: JournalEntry) -> None:
+        """Carry a new volume through the remaining (journaled) phases of creation.
+
+        Args:
+            volume (Volume): The newly created volume
+            entry (JournalEntry): The currently pending phase
+
+        Raises:
+            ResourceCreateFailure: Raised if any of the phases fail. The failed phase is resumed by the next apply.
+        """
+        if entry.phase == 'wait_for_active':
+            self._wait_for_active(volume=volume, timeout=entry.remaining())
+
+        self._logger.log(message=f'Volume creation complete: {volume.id}')
+
+        # Save the filesystem path and hardware type
+        self.filesystem_path = volume.filesystem_path
+        self.hardware_type = volume.hardware_type
+
+        if self.instance:
+            linode: LinodeInstance = self.instance.from_db()
+
+            # The phase is recorded before attaching, so that a resumed create knows an attach may be in-flight
+            if entry.phase == 'wait_for_active':
+                entry = self._record_phase(phase='wait_for_attach')
+
+            volume.invalidate()
+            if volume.linode_id != linode.instance_id:
+                self._logger.log(f'Attaching volume ({volume.id}) to instance ({linode.instance_id})')
+                volume.attach(to_linode=linode.instance_id)
+
+            ssh_client = linode.ssh_connect()
+            self._wait_for_attach(ssh_client=ssh_client, timeout=entry.remaining())
+
+            # Mount the volume
+            if self.mount_point:
+                self._mount(ssh_client=ssh_client, linode=linode)
+
+        # The create is complete
+        self.pending_operation = None
+        self.update()
+        self._journal.clear()
+
+    def _record_phase(self, phase: str) -> JournalEntry:
+        """Record that the create has moved on to a new phase.
+
+        Args:
+            phase (str): The phase that is now pending
+
+        Returns:
+            JournalEntry: The journaled phase
+        """
+        entry = self._journal.record(entity_id=self.volume_id, phase=phase, timeout=VOLUME_WAIT_TIMEOUT)
+        self.pending_operation = phase
+        self.update()
+
+        return entry
+
+    def _wait_for_active(self, volume: Volume, timeout: int) -> None:
+        """Wait for the volume to become active.
+
+        Args:
+            volume (Volume): The volume to wait on
+            timeout (int): Number of seconds to wait
+
+        Raises:
+            ResourceCreateFailure: Raised if the volume never became active
+        """
+        time_left = timeout
         while time_left > 0:
             volume.invalidate()
             if volume.status == 'active':
@@ -91,76 +242,165 @@ class LinodeVolume(StackzillaResource):
             raise ResourceCreateFailure(reason=f'Volume never reached active state: {volume.status}',
                                         resource_name=self.path())
 
-        # Save the new volume ID
-        self.volume_id = volume.id
-        self._logger.log(message=f'Volume creation complete: {volume.id}')
+    def _wait_for_attach(self, ssh_client: SSHClient, timeout: int) -> None:
+        """Wait for the device attachment point to show up on the instance (attachment is done).
 
-        # Save the filesystem path
-        self.filesystem_path = volume.filesystem_path
+        Args:
+            ssh_client (SSHClient): Connection to the instance the volume is being attached to
+            timeout (int): Number of seconds to wait
 
-        # Save the hardware type
-        self.hardware_type = volume.hardware_type
+        Raises:
+            ResourceCreateFailure: Raised if the attachment never completed
+        """
+        time_left = timeout
+        while time_left > 0:
+            result: CmdResult = ssh_client.run_command(command=f'stat {self.filesystem_path}')
+            if result.exit_code == 0:
+                # Wait one more second. If we return right away, the API will yell at us!
+                sleep(1)
+                break
 
-        # Update the database with the new information
-        super().update()
+            sleep(1)
+            time_left -= 1
 
-        if self.instance:
-            linode: LinodeInstance = self.instance.from_db()
-            ssh_client = linode.ssh_connect()
+        if time_left == 0:
+            raise ResourceCreateFailure(reason='Volume never attached to instance',
+                                        resource_name=self.path())
 
-            self._logger.log(f'Attaching volume ({volume.id}) to instance ({linode.instance_id})')
-            volume.attach(to_linode=linode.instance_id)
+        self._logger.log('Attachment complete')
 
-            # Wait for the device attachment point to show up on the instance (attachment is done)
-            time_left = 120
-            while time_left > 0:
-                result: CmdResult = ssh_client.run_command(command=f'stat {self.filesystem_path}')
-                if result.exit_code == 0:
-                    # Wait one more second. If we return right away, the API will yell at us!
-                    sleep(1)
-                    break
+    def _mount(self, ssh_client: SSHClient, linode: LinodeInstance) -> None:
+        """Format (if needed) and mount the volume on the instance.
 
-                sleep(1)
-                time_left -= 1
+        Args:
+            ssh_client (SSHClient): Connection to the instance the volume is attached to
+            linode (LinodeInstance): The instance the volume is attached to
 
-            if time_left == 0:
-                raise ResourceCreateFailure(reason='Volume never attached to instance',
-                                            resource_name=self.path())
+        Raises:
+            ResourceCreateFailure: Raised if the format or mount fails
+        """
+        # Before mounting, format the file system (if one doesn't already exist)
+        if self.file_system_type:
+            # Use 'blkid' to see if a file system already exists
+            result: CmdResult = ssh_client.run_command(command=f'blkid {self.filesystem_path}', sudo=True)
+            if result.exit_code == 0:
+                self._logger.log(f'File system already exists at {self.filesystem_path}. Skipping volume format.')
+            else:
+                self._format(ssh_client=ssh_client, linode=linode)
+
+        # Create the directory to mount the volume to
+        mkdir_cmd = f'mkdir -p {self.mount_point}'
+        self._logger.log(f'Creating mount point: {mkdir_cmd}')
+        result: CmdResult = ssh_client.run_command(command=mkdir_cmd, sudo=True, use_pty=True)
+        if result.exit_code:
+            raise ResourceCreateFailure(reason=f'Failed to create a mount point directory: {result.stdout}',
+                                        resource_name=self.path())
 
-            self._logger.log('Attachment complete')
+        # OK...NOW we will mount the volume!
+        result: CmdResult = ssh_client.run_command(command=f'mount {self.filesystem_path} {self.mount_point}', sudo=True)
+        if result.exit_code:
+            raise ResourceCreateFailure(reason=f'Failed to mount the volume: {result.stdout}', resource_name=self.path())
 
-            # Mount the volume
-            if self.mount_point:
+        # TODO: Add the volume and mount point to fstab
+
+    def _format(self, ssh_client: SSHClient, linode: LinodeInstance) -> None:
+        """Format the volume, along with any sibling volumes which are yet to be created on the same instance.
+
+        Volumes are created one at a time, so the siblings are created and attached here, ahead of their turn.
+        All of the formats are then run together. Each sibling's own create() adopts the journaled volume, finds
+        the file system and only mounts it. A sibling which could not be prepared or formatted is only logged,
+        its own create() carries on from wherever it got to.
+
+        Args:
+            ssh_client (SSHClient): Connection to the instance the volume is attached to
+            linode (LinodeInstance): The instance the volume is attached to
+
+        Raises:
+            ResourceCreateFailure: Raised if this volume could not be formatted
+        """
+        jobs = [FormatJob(ssh_client=ssh_client, device=self.filesystem_path,
+                          file_system_type=self.file_system_type, fast=self.fast_format)]
+
+        for sibling in self._format_siblings():
+            self._logger.log(f'Creating {sibling.path(remove_prefix=True)} early, to format it in parallel')
+            job = sibling._prepare_format(ssh_client=ssh_client, linode=linode)  # pylint: disable=protected-access
+            if job:
+                jobs.append(job)
+
+        failures = run_format_jobs(jobs=jobs, logger=self._logger)
+        if self.filesystem_path in failures:
+            raise ResourceCreateFailure(reason=f'Failed to format volume: {failures[self.filesystem_path]}',
+                                        resource_name=self.path())
+
+    def _format_siblings(self) -> List['LinodeVolume']:
+        """Find the other volumes in the blueprint which are to be formatted on the same instance, and are not yet created.
 
+        Only volumes which depend on nothing but the instance are returned, since those are safe to create early.
 
-                # Before mounting, format the file system (if one doesn't already exist)
-                if self.file_system_type:
-                    # Use 'blkid' to see if a file system already exists
-                    result: CmdResult = ssh_client.run_command(command=f'blkid {self.filesystem_path}', sudo=True)
-                    if result.exit_code == 0:
-                        self._logger.log(f'File system already exists at {self.filesystem_path}. Skipping volume format.')
-                    else:
-                        # Format the file system
-                        format_cmd = f'mkfs.{self.file_system_type} {self.filesystem_path}'
-                        self._logger.log(f'Formatting: {format_cmd}')
-                        result: CmdResult = ssh_client.run_command(command=format_cmd, sudo=True)
-                        if result.exit_code:
-                            raise ResourceCreateFailure(reason=f'Failed to format volume: {result.stderr}', resource_name=self.path())
+        Returns:
+            List[LinodeVolume]: The sibling volumes
+        """
+        blueprint = type(self).__module__.split('.', maxsplit=1)[0]
+
+        siblings = []
+        for volume_class in _volume_classes():
+            if volume_class.path() == self.path() or volume_class.__module__.split('.', maxsplit=1)[0] != blueprint:
+                continue
+
+            sibling = volume_class()
+            if not (sibling.file_system_type and sibling.mount_point):
+                continue
+
+            if [dependency.path() for dependency in sibling.depends_on()] != [self.instance.path()]:
+                continue
+
+            # Skip volumes which are already created, or whose create is already in-flight
+            if sibling._journal.pending() or sibling._in_db():  # pylint: disable=protected-access
+                continue
+
+            siblings.append(sibling)
+
+        return siblings
+
+    def _in_db(self) -> bool:
+        """Check if the volume has been persisted to the database."""
+        try:
+            StackzillaDB.db.get_attribute(resource=self, name='volume_id')
+        except ResourceNotFound:
+            return False
+
+        return True
 
-                # Create the directory to mount the volume to
-                mkdir_cmd = f'mkdir -p {self.mount_point}'
-                self._logger.log(f'Creating mount point: {mkdir_cmd}')
-                result: CmdResult = ssh_client.run_command(command=mkdir_cmd, sudo=True, use_pty=True)
-                if result.exit_code:
-                    raise ResourceCreateFailure(reason=f'Failed to create a mount point directory: {result.stdout}', resource_name=self.path())
+    def _prepare_format(self, ssh_client: SSHClient, linode: LinodeInstance) -> Optional[FormatJob]:
+        """Create and attach this volume ahead of its own create, so that it can be formatted alongside a sibling.
 
-                # OK...NOW we will mount the volume!
-                result: CmdResult = ssh_client.run_command(command=f'mount {self.filesystem_path} {self.mount_point}', sudo=True)
-                if result.exit_code:
-                    raise ResourceCreateFailure(reason=f'Failed to mount the volume: {result.stdout}', resource_name=self.path())
+        Every phase is journaled, so that this volume's own create() adopts the volume rather than creating another.
 
-                # TODO: Add the volume and mount point to fstab
+        Args:
+            ssh_client (SSHClient): Connection to the instance to attach to
+            linode (LinodeInstance): The instance to attach to
 
+        Returns:
+            Optional[FormatJob]: The format to run, or None if the volume could not be created and attached
+        """
+        try:
+            volume = self._create_volume()
+            entry = self._journal.record(entity_id=volume.id, phase='wait_for_active', timeout=VOLUME_WAIT_TIMEOUT)
+            self._wait_for_active(volume=volume, timeout=entry.remaining())
+
+            entry = self._journal.record(entity_id=volume.id, phase='wait_for_attach', timeout=VOLUME_WAIT_TIMEOUT)
+            volume.attach(to_linode=linode.instance_id)
+            self.filesystem_path = volume.filesystem_path
+            self._wait_for_attach(ssh_client=ssh_client, timeout=entry.remaining())
+        except ResourceCreateFailure as err:
+            self._logger.warning(f'Unable to create the volume early, it will be formatted on its own: {err.reason}')
+            return None
+        except ApiError as err:
+            self._logger.warning(f'Unable to attach the volume early, it will be formatted on its own: {err}')
+            return None
+
+        return FormatJob(ssh_client=ssh_client, device=self.filesystem_path,
+                         file_system_type=self.file_system_type, fast=self.fast_format)
 
     def delete(self) -> None:
         """Delete a previously created volume."""
@@ -170,45 +410,67 @@ class LinodeVolume(StackzillaResource):
 
         # Detach the volume
         if self.instance:
-            linode: LinodeInstance = self.instance.from_db()
-            ssh_client = linode.ssh_connect()
-            self._logger.debug('Unmounting volume')
-            result: CmdResult = ssh_client.run_command(command=f'umount -f {self.mount_point}')
-            if result.exit_code != 0:
-                self._logger.warning(f'Unable to unmount volume: {result.stderr}')
+            # Resume a detachment that was interrupted during a previous delete
+            entry = self._journal.pending()
+            if entry and entry.phase == 'wait_for_detach':
+                self._logger.debug(f'Resuming detachment of volume {entry.entity_id}')
+            else:
+                linode: LinodeInstance = self.instance.from_db()
+                ssh_client = linode.ssh_connect()
+                self._logger.debug('Unmounting volume')
+                result: CmdResult = ssh_client.run_command(command=f'umount -f {self.mount_point}')
+                if result.exit_code != 0:
+                    self._logger.warning(f'Unable to unmount volume: {result.stderr}')
+
+                # The phase is recorded before detaching, so that a resumed delete knows a detach may be in-flight
+                entry = self._journal.record(entity_id=self.volume_id, phase='wait_for_detach', timeout=VOLUME_WAIT_TIMEOUT)
 
             # Fire off the initial detachment request (retries may occur in the wait loop below)
-            self._logger.debug('Detaching volume')
-            volume.detach()
-
-            # Wait for the detach operation to complete
-            time_left = 120
-            while time_left > 0:
-                volume.invalidate()
-                if not volume.linode_id:
-                    # Wait one more second - this will fail if we bail immediately
-                    sleep(1)
-                    break
-
-                # Wait a second before trying again
-                sleep(1)
-                time_left -= 1
-
-                # !!!!HACK!!!!
-                # The API does NOT let us know if the detachment operation failed.
-                # To work around this, every 5 seconds, we'll re-issue the detachment command
-                if time_left > 0 and time_left % 5 == 0:
-                    self._logger.debug('Resending detach request...')
-                    volume.detach()
+            if volume.linode_id:
+                self._logger.debug('Detaching volume')
+                volume.detach()
 
+            self._wait_for_detach(volume=volume, timeout=entry.remaining())
             self._logger.debug('Detach complete')
 
         self._logger.debug('Deleting volume')
         volume.delete()
+        self._journal.clear()
         self._logger.debug('Deletion complete')
 
         super().delete()
 
+    def _wait_for_detach(self, volume: Volume, timeout: int) -> None:
+        """Wait for the detach operation to complete.
+
+        Args:
+            volume (Volume): The volume being detached
+            timeout (int): Number of seconds to wait
+        """
+        time_left = timeout
+        while time_left > 0:
+            volume.invalidate()
+            if not volume.linode_id:
+                # Wait one more second - this will fail if we bail immediately
+                sleep(1)
+                break
+
+            # Wait a second before trying again
+            sleep(1)
+            time_left -= 1
+
+            # !!!!HACK!!!!
+            # The API does NOT let us know if the detachment operation failed.
+            # To work around this, every 5 seconds, we'll re-issue the detachment command
+            if time_left > 0 and time_left % 5 == 0:
+                self._logger.debug('Resending detach request...')
+                volume.detach()
+
+    def load_from_db(self, silent_fail: bool=False):
+        """Import all of the attribute values from the database."""
+        backfill_pending_operation(resource=self)
+        super().load_from_db(silent_fail=silent_fail)
+
     def depends_on(self) -> List['StackzillaResource']:
         """Required to be overridden."""
         result = []
@@ -217,6 +479,28 @@ class LinodeVolume(StackzillaResource):
 
         return result
 
+    def pending_operation_modified(self, previous_value: Any, new_value: Any) -> None:
+        """Resume a create which was interrupted during a previous apply.
+
+        Args:
+            previous_value (Any): The phase the create was interrupted in
+            new_value (Any): Always None, the blueprint never declares a pending operation
+
+        Raises:
+            AttributeModifyFailure: Raised if the create could not be completed. It is resumed again by the next apply.
+        """
+        self._logger.log(f'Resuming creation of volume {self.volume_id} ({previous_value} -> {new_value})')
+
+        entry = self._journal.pending()
+        if entry is None:
+            entry = JournalEntry(entity_id=self.volume_id, phase=previous_value, timeout=VOLUME_WAIT_TIMEOUT,
+                                 deadline=time() + VOLUME_WAIT_TIMEOUT)
+
+        try:
+            self._complete_create(volume=Volume(client=self.api, id=self.volume_id), entry=entry)
+        except ResourceCreateFailure as exc:
+            raise AttributeModifyFailure(attribute_name='pending_operation', reason=exc.reason) from exc
+
     def label_modified(self, previous_value: Any, new_value: Any) -> None:
         """Called when the label value needs modification.
 
@@ -253,19 +537,16 @@ class LinodeVolume(StackzillaResource):
         Args:
             previous_value (Any): Previous list of tags
             new_value (Any): New list of tags
-        """
-        volume = Volume(client=self.api, id=self.volume_id)
-
-        # Short circuit out
-        if volume.tags == new_value:
-            return
 
+        Raises:
+            AttributeModifyFailure: Raised if the tags could not be updated
+        """
         self._logger.log(f'Updating volume tag from {previous_value} to {new_value}')
-        volume.tags = new_value
 
-        if volume.save() is False:
-            # TODO: Raise a failure here
-            self._logger.critical(message='Volume save failed')
+        try:
+            save_tags(client=self.api, kind=VOLUMES, entity_id=self.volume_id, tags=new_value)
+        except TagChangeError as exc:
+            raise AttributeModifyFailure(attribute_name='tags', reason=str(exc)) from exc
 
     def size_modified(self, previous_value: Any, new_value: Any) -> None:
         """Handler for when the size attribute is modified.
@@ -289,11 +570,37 @@ class LinodeVolume(StackzillaResource):
         """Custom verifications for the Volume resource."""
         super().verify()
 
+        # The pending operation is tracked by the provider, it can not be declared in the blueprint
+        if self.pending_operation is not None:
+            err = ResourceVerifyError(resource_name=self.path())
+            err.add_attribute_error(name='pending_operation', error='Set by the provider, must not be declared')
+            raise err
+
         # User must specify mount_point if file_system_type is specifed
         if self.file_system_type and self.mount_point is None:
             raise ResourceVerifyError('mount_point must be specified if file_system_type is declared')
 
+        # Fast formatting only applies when there is a file system to format
+        if self.fast_format and not self.file_system_type:
+            err = ResourceVerifyError(resource_name=self.path())
+            err.add_attribute_error(name='fast_format', error='file_system_type must be declared to fast format')
+            raise err
+
     @classmethod
     def version(cls) -> ResourceVersion:
         """Fetch the version of the resource provider."""
         return ResourceVersion(major=0, minor=1, build=0, name='alpha')
+
+
+def _volume_classes(base: Type[LinodeVolume]=LinodeVolume) -> Iterator[Type[LinodeVolume]]:
+    """Walk all of the loaded volume classes, which includes every volume declared in a blueprint.
+
+    Args:
+        base (Type[LinodeVolume], optional): The class to walk the subclasses of. Defaults to LinodeVolume.
+
+    Yields:
+        Type[LinodeVolume]: Each volume class
+    """
+    for subclass in base.__subclasses__():
+        yield subclass
+        yield from _volume_classes(base=subclass)
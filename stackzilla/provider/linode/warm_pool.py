@@ -0,0 +1,383 @@
+"""Pool of pre-provisioned, SSH-ready Linodes which can be claimed in place of creating a new instance."""
+import shlex
+import socket
+import time
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from linode_api4 import LinodeClient
+from linode_api4.errors import ApiError
+from linode_api4.objects.linode import Instance
+from pssh.clients.ssh import SSHClient as PSSHClient
+from pssh.exceptions import (AuthenticationError, SessionError, SSHError,
+                             Timeout, UnknownHostError)
+from stackzilla.database.base import StackzillaDB
+from stackzilla.database.exceptions import MetadataKeyNotFound
+from stackzilla.logger.provider import ProviderLogger
+from stackzilla.utils.ssh import CmdResult, SSHClient
+
+
+# Every pool member (booting or ready) is placed into this group
+STANDBY_GROUP = 'stackzilla-standby'
+
+# Only pool members which are booted and accepting SSH connections carry this tag
+STANDBY_TAG = 'stackzilla-standby'
+
+# Number of seconds to wait for a new pool member to start accepting SSH connections
+STANDBY_BOOT_TIMEOUT = 300
+
+# Metadata key for the SSH key which is authorized on every pool member until it is claimed
+POOL_KEY_METADATA = 'linode.warm_pool.key'
+
+# Metadata key for the instances which were created with a warm pool, mapped to the (region, type, image) of their pool
+POOL_USERS_METADATA = 'linode.warm_pool.users'
+
+# Number of seconds between checks on the pool members which are still booting
+STANDBY_POLL_INTERVAL = 5
+
+# Everything that can go wrong while connecting to, or running a command on, a pool member.
+# OSError covers refused connections, socket timeouts and pssh.exceptions.ConnectionError.
+SSH_ERRORS = (AuthenticationError, SessionError, SSHError, Timeout, UnknownHostError, OSError)
+
+
+class WarmPoolError(Exception):
+    """Raised when a claimed pool member could not be handed over to its new owner."""
+
+
+def _ssh_ready(host: str, timeout: float=5) -> bool:
+    """Check if a host is accepting connections on the SSH port.
+
+    Args:
+        host (str): Address of the host
+        timeout (float, optional): Connection timeout, in seconds. Defaults to 5.
+
+    Returns:
+        bool: True if the SSH port accepted the connection
+    """
+    try:
+        with socket.create_connection((host, 22), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _pool_key() -> Tuple[bytes, str]:
+    """Fetch (or generate) the SSH key which is authorized on every pool member.
+
+    Returns:
+        Tuple[bytes, str]: The PEM private key and OpenSSH public key
+    """
+    try:
+        value = StackzillaDB.db.get_metadata(key=POOL_KEY_METADATA)
+        return value['private_key'].encode('utf-8'), value['public_key']
+    except MetadataKeyNotFound:
+        pass
+
+    key = rsa.generate_private_key(backend=default_backend(), public_exponent=65537, key_size=2048)
+    private_key = key.private_bytes(encoding=serialization.Encoding.PEM,
+                                    format=serialization.PrivateFormat.PKCS8,
+                                    encryption_algorithm=serialization.NoEncryption())
+    public_key = key.public_key().public_bytes(encoding=serialization.Encoding.OpenSSH,
+                                               format=serialization.PublicFormat.OpenSSH)
+
+    StackzillaDB.db.set_metadata(key=POOL_KEY_METADATA,
+                                 value={'private_key': private_key.decode('utf-8'), 'public_key': public_key.decode('utf-8')})
+    return private_key, public_key.decode('utf-8')
+
+
+# pylint: disable=too-many-instance-attributes
+class WarmPool:
+    """Pool of booted, SSH-ready instances for a single (region, type, image) combination."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, client: LinodeClient, region: str, ltype: str, image: str, size: int):
+        """Setup the pool.
+
+        Args:
+            client (LinodeClient): Client used to manage the pool members
+            region (str): Region of the pool members
+            ltype (str): Instance type of the pool members
+            image (str): Image the pool members are booted from
+            size (int): Number of pool members to keep available
+        """
+        self._client = client
+        self._region = region
+        self._ltype = ltype
+        self._image = image
+        self.size = size
+
+        self._logger = ProviderLogger(provider_name='linode.warm_pool', resource_name=f'{region}/{ltype}/{image}')
+        self._private_key, self._public_key = _pool_key()
+        self._claim_lock = Lock()
+        self._refill_thread: Optional[Thread] = None
+        self._stopped = Event()
+
+    def members(self) -> List[Instance]:
+        """Query all of the pool members, including any which are still booting.
+
+        Returns:
+            List[Instance]: The pool members
+        """
+        candidates = self._client.linode.instances(Instance.group == STANDBY_GROUP,
+                                                   Instance.region == self._region,
+                                                   Instance.image == self._image)
+        return [instance for instance in candidates if instance.type.id == self._ltype]
+
+    def claim(self, label: Optional[str], group: Optional[str], tags: Optional[List[str]]) -> Optional[Instance]:
+        """Claim a ready pool member, moving it out of the pool.
+
+        Args:
+            label (Optional[str]): New label for the instance. The pool label is kept if None.
+            group (Optional[str]): New group for the instance
+            tags (Optional[List[str]]): New tags for the instance
+
+        Returns:
+            Optional[Instance]: The claimed instance, or None if no pool members are ready
+        """
+        with self._claim_lock:
+            for instance in self.members():
+                if STANDBY_TAG not in instance.tags or instance.status != 'running':
+                    continue
+
+                # Relabel, regroup and retag in a single save, which also removes the instance from the pool
+                if label:
+                    instance.label = label
+                instance.group = group or ''
+                instance.tags = tags or []
+
+                try:
+                    instance.save()
+                except ApiError as err:
+                    self._logger.warning(f'Unable to claim pool member {instance.id}: {err}')
+                    continue
+
+                self._logger.log(f'Claimed pool member {instance.id}')
+                return instance
+
+        return None
+
+    def hand_over(self, instance: Instance, root_password: str, public_key: Optional[str]) -> None:
+        """Replace the pool credentials on a claimed instance with those of its new owner.
+
+        Args:
+            instance (Instance): The claimed instance
+            root_password (str): New root password
+            public_key (Optional[str]): The OpenSSH public key to authorize. The pool key is revoked either way.
+
+        Raises:
+            WarmPoolError: Raised if the credentials could not be replaced
+        """
+        authorized_keys = public_key or ''
+        command = (f"printf '%s\\n' {shlex.quote('root:' + root_password)} | chpasswd && "
+                   f"printf '%s\\n' {shlex.quote(authorized_keys)} > /root/.ssh/authorized_keys")
+
+        try:
+            client = SSHClient(client=PSSHClient(host=instance.ipv4[0], port=22, user='root', pkey=self._private_key))
+            try:
+                result: CmdResult = client.run_command(command=command)
+            finally:
+                client.disconnect()
+        except SSH_ERRORS as err:
+            raise WarmPoolError(f'Unable to connect to pool member {instance.id}: {err}') from err
+
+        if result.exit_code:
+            raise WarmPoolError(f'Unable to replace the credentials on pool member {instance.id}: {result.stderr}')
+
+    def refill_async(self) -> None:
+        """Refill the pool in the background, unless a refill is already running or the pool is stopped."""
+        if self._stopped.is_set() or (self._refill_thread and self._refill_thread.is_alive()):
+            return
+
+        self._refill_thread = Thread(target=self.refill, name='linode-warm-pool-refill', daemon=True)
+        self._refill_thread.start()
+
+    def refill(self) -> None:
+        """Create pool members until the pool is full, and mark them ready once they accept SSH connections.
+
+        Runs on the refill thread, so every failure is logged rather than raised.
+        """
+        try:
+            self._refill()
+        except Exception as err:  # pylint: disable=broad-except
+            self._logger.critical(f'Pool refill failed: {err}')
+
+    def _refill(self) -> None:
+        """Carry out a refill, returning early once the pool is stopped."""
+        members = self.members()
+        booting = [instance for instance in members if STANDBY_TAG not in instance.tags]
+
+        for _ in range(self.size - len(members)):
+            if self._stopped.is_set():
+                return
+
+            instance, _ = self._client.linode.instance_create(ltype=self._ltype, region=self._region, image=self._image,
+                                                              group=STANDBY_GROUP, authorized_keys=[self._public_key])
+            self._logger.debug(f'Created pool member {instance.id}')
+            booting.append(instance)
+
+        deadline = time.time() + STANDBY_BOOT_TIMEOUT
+        while booting and time.time() < deadline:
+            for instance in list(booting):
+                if _ssh_ready(host=instance.ipv4[0]):
+                    instance.tags = [STANDBY_TAG]
+                    instance.save()
+                    booting.remove(instance)
+                    self._logger.debug(f'Pool member {instance.id} is ready')
+
+            # Sleep until the next check, or until the pool is stopped
+            if booting and self._stopped.wait(timeout=STANDBY_POLL_INTERVAL):
+                return
+
+        for instance in booting:
+            self._logger.warning(f'Pool member {instance.id} was not accepting SSH connections after {STANDBY_BOOT_TIMEOUT}s')
+
+    def stop_refill(self) -> None:
+        """Stop the pool from being refilled, waiting on any refill which is already running.
+
+        The refill returns at its next step, so this only waits on an API call or SSH check which is in progress.
+        """
+        self.size = 0
+        self._stopped.set()
+        if self._refill_thread:
+            self._refill_thread.join()
+
+    def drain(self) -> None:
+        """Stop refilling the pool and delete all of its members, including any which are still booting.
+
+        Raises:
+            WarmPoolError: Raised if any of the members could not be deleted
+        """
+        self.stop_refill()
+
+        with self._claim_lock:
+            _delete_members(members=self.members(), logger=self._logger)
+
+
+def _delete_members(members: List[Instance], logger: ProviderLogger) -> None:
+    """Delete a set of pool members.
+
+    Args:
+        members (List[Instance]): The pool members to delete
+        logger (ProviderLogger): Logger for progress reporting
+
+    Raises:
+        WarmPoolError: Raised if any of the members could not be deleted
+    """
+    failed = []
+    for instance in members:
+        try:
+            instance.delete()
+            logger.debug(f'Deleted pool member {instance.id}')
+        except ApiError as err:
+            logger.critical(f'Unable to delete pool member {instance.id}: {err}')
+            failed.append(str(instance.id))
+
+    if failed:
+        raise WarmPoolError(f'Unable to delete pool members: {", ".join(failed)}')
+
+
+# Pools are shared across all resources declaring the same (region, type, image)
+_pools: Dict[Tuple[str, str, str], WarmPool] = {}
+_pools_lock = Lock()
+
+
+# pylint: disable=too-many-arguments
+def get_warm_pool(client: LinodeClient, region: str, ltype: str, image: str, size: int) -> WarmPool:
+    """Fetch (or create) the shared warm pool for a (region, type, image) combination.
+
+    Args:
+        client (LinodeClient): Client used to manage the pool members (only used when the pool is created)
+        region (str): Region of the pool members
+        ltype (str): Instance type of the pool members
+        image (str): Image the pool members are booted from
+        size (int): Number of pool members to keep available
+
+    Returns:
+        WarmPool: The shared pool
+    """
+    key = (region, ltype, image)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = WarmPool(client=client, region=region, ltype=ltype, image=image, size=size)
+
+        _pools[key].size = max(_pools[key].size, size)
+        return _pools[key]
+
+
+def add_pool_user(path: str, region: str, ltype: str, image: str) -> None:
+    """Record an instance which was created with a warm pool, so that the pool is drained once it is no longer used.
+
+    Args:
+        path (str): Path of the instance resource
+        region (str): Region of the pool
+        ltype (str): Instance type of the pool
+        image (str): Image of the pool
+    """
+    with _pools_lock:
+        users = _pool_users()
+        users[path] = [region, ltype, image]
+        StackzillaDB.db.set_metadata(key=POOL_USERS_METADATA, value=users)
+
+
+def release_pool_user(client: LinodeClient, path: str) -> None:
+    """Forget about a deleted instance, draining its warm pool if no other instance uses it.
+
+    Args:
+        client (LinodeClient): Client used to delete the pool members
+        path (str): Path of the deleted instance resource
+
+    Raises:
+        WarmPoolError: Raised if any of the members could not be deleted
+    """
+    with _pools_lock:
+        users = _pool_users()
+        key = users.pop(path, None)
+        if key is None:
+            return
+
+        StackzillaDB.db.set_metadata(key=POOL_USERS_METADATA, value=users)
+        if key in users.values():
+            return
+
+        pool = _pools.pop(tuple(key), None) or WarmPool(client=client, region=key[0], ltype=key[1], image=key[2], size=0)
+
+    pool.drain()
+
+
+def _pool_users() -> Dict[str, List[str]]:
+    """Fetch the instances which were created with a warm pool.
+
+    Returns:
+        Dict[str, List[str]]: The (region, type, image) of the pool for each instance path
+    """
+    try:
+        return StackzillaDB.db.get_metadata(key=POOL_USERS_METADATA)
+    except MetadataKeyNotFound:
+        return {}
+
+
+def drain_warm_pools(client: LinodeClient) -> None:
+    """Tear down every warm pool on the account, including pools left behind by earlier runs.
+
+    Args:
+        client (LinodeClient): Client used to delete the pool members
+
+    Raises:
+        WarmPoolError: Raised if any of the members could not be deleted
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+        if StackzillaDB.db.check_metadata(key=POOL_USERS_METADATA):
+            StackzillaDB.db.delete_metadata(key=POOL_USERS_METADATA)
+
+    # Stop any refills in this process first, so that no new members show up while deleting
+    for pool in pools:
+        pool.stop_refill()
+
+    logger = ProviderLogger(provider_name='linode.warm_pool', resource_name='all')
+    _delete_members(members=list(client.linode.instances(Instance.group == STANDBY_GROUP)), logger=logger)